@@ -0,0 +1,169 @@
+"""Сводная аналитика преподавателя по всем его курсам.
+
+Результаты курсов преподавателя читаются одним запросом тройками
+(студент, тест, балл) в массивы NumPy, а показатели по студентам, тестам и
+курсам считаются векторно: id переводятся в позиции через searchsorted,
+количества и суммы баллов - через bincount.
+"""
+import itertools
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def fetch_columns(db: Session, statement, width: int):
+    """Результат запроса из целых чисел в виде массива (строки, width).
+
+    Запрос выполняется через соединение, минуя построение строк ORM.
+    """
+    rows = db.connection().execute(statement).all()
+    values = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width)
+    return values.reshape(len(rows), width)
+
+def ratio(numerator, denominator, scale=1.0):
+    """Поэлементное деление с нулём там, где знаменатель равен нулю, округлённое до десятых"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    result = np.divide(numerator * scale, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+    return np.round(result, 1)
+
+def positions(sorted_ids, ids):
+    """Позиции ids в отсортированном массиве и маска найденных"""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    index = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return index, sorted_ids[index] == ids
+
+def load_teacher_analytics(db: Session, teacher_id: int):
+    courses = db.query(models.Course.id, models.Course.name, models.Course.group_id, models.Group.name)\
+        .join(models.Group, models.Course.group_id == models.Group.id)\
+        .filter(models.Course.teacher_id == teacher_id)\
+        .order_by(models.Course.id)\
+        .all()
+    course_ids = np.array([course.id for course in courses], dtype=np.int64)
+    course_groups = np.array([course.group_id for course in courses], dtype=np.int64)
+    group_ids = np.unique(course_groups)
+
+    tests = db.query(models.Test.id, models.Test.name, models.Test.course_id)\
+        .filter(models.Test.course_id.in_(course_ids.tolist()))\
+        .order_by(models.Test.id)\
+        .all()
+    test_ids = np.array([test.id for test in tests], dtype=np.int64)
+    test_course = positions(course_ids, np.array([test.course_id for test in tests], dtype=np.int64))[0]
+
+    students = db.query(models.User.id, models.User.fio, models.User.login, models.User.group_id)\
+        .filter(
+            models.User.group_id.in_(group_ids.tolist()),
+            models.User.role == "student"
+        )\
+        .order_by(models.User.id)\
+        .all()
+    student_ids = np.array([student.id for student in students], dtype=np.int64)
+    student_groups = np.array([student.group_id for student in students], dtype=np.int64)
+
+    # Все результаты по тестам преподавателя одним запросом: столбцы student_id, test_id, score
+    results = fetch_columns(
+        db,
+        select(models.CompletedTest.student_id, models.CompletedTest.test_id, models.CompletedTest.score)\
+            .where(models.CompletedTest.test_id.in_(
+                select(models.Test.id)\
+                    .join(models.Course, models.Test.course_id == models.Course.id)\
+                    .where(models.Course.teacher_id == teacher_id)
+            )),
+        3
+    )
+
+    # Учитываются только студенты, которые сейчас состоят в группе курса (как в статистике курса)
+    result_test = positions(test_ids, results[:, 1])[0]
+    result_course = test_course[result_test]
+    result_student, known = positions(student_ids, results[:, 0])
+    if len(student_ids):
+        known &= student_groups[result_student] == course_groups[result_course]
+    result_test, result_course, result_student = result_test[known], result_course[known], result_student[known]
+    scores = results[known, 2].astype(np.float64)
+
+    group_index = positions(group_ids, student_groups)[0]
+    students_per_group = np.bincount(group_index, minlength=len(group_ids))
+    course_group_index = positions(group_ids, course_groups)[0]
+    course_students = students_per_group[course_group_index]
+
+    tests_per_course = np.bincount(test_course, minlength=len(course_ids))
+    tests_per_group = np.bincount(course_group_index, weights=tests_per_course, minlength=len(group_ids))
+    student_tests = tests_per_group[group_index]
+    test_students = course_students[test_course]
+
+    test_completed = np.bincount(result_test, minlength=len(test_ids))
+    test_scores = np.bincount(result_test, weights=scores, minlength=len(test_ids))
+    course_completed = np.bincount(result_course, minlength=len(course_ids))
+    course_scores = np.bincount(result_course, weights=scores, minlength=len(course_ids))
+    course_possible = tests_per_course * course_students
+    student_completed = np.bincount(result_student, minlength=len(student_ids))
+    student_scores = np.bincount(result_student, weights=scores, minlength=len(student_ids))
+
+    total_possible = course_possible.sum()
+
+    return {
+        "course_count": len(courses),
+        "test_count": len(tests),
+        "student_count": len(students),
+        "result_count": int(known.sum()),
+        "average_score": round(float(scores.mean()), 1) if len(scores) else 0.0,
+        "completion_rate": round(float(len(scores) / total_possible * 100), 1) if total_possible > 0 else 0.0,
+        "courses": [
+            {
+                "course_id": course_id,
+                "course_name": course_name,
+                "group_name": group_name,
+                "student_count": student_count,
+                "test_count": test_count,
+                "completed_count": completed_count,
+                "completion_rate": completion_rate,
+                "average_score": average_score
+            }
+            for (course_id, course_name, _, group_name), student_count, test_count, completed_count, completion_rate, average_score in zip(
+                courses,
+                course_students.tolist(),
+                tests_per_course.tolist(),
+                course_completed.tolist(),
+                ratio(course_completed, course_possible, 100).tolist(),
+                ratio(course_scores, course_completed).tolist()
+            )
+        ],
+        "tests": [
+            {
+                "test_id": test.id,
+                "test_name": test.name,
+                "course_id": test.course_id,
+                "completed_count": completed_count,
+                "completion_rate": completion_rate,
+                "average_score": average_score
+            }
+            for test, completed_count, completion_rate, average_score in zip(
+                tests,
+                test_completed.tolist(),
+                ratio(test_completed, test_students, 100).tolist(),
+                ratio(test_scores, test_completed).tolist()
+            )
+        ],
+        "students": [
+            {
+                "student_id": student.id,
+                "student_name": student.fio,
+                "student_login": student.login,
+                "group_id": student.group_id,
+                "completed_tests": completed_count,
+                "total_tests": int(total_tests),
+                "completion_rate": completion_rate,
+                "average_score": average_score
+            }
+            for student, completed_count, total_tests, completion_rate, average_score in zip(
+                students,
+                student_completed.tolist(),
+                student_tests.tolist(),
+                ratio(student_completed, student_tests, 100).tolist(),
+                ratio(student_scores, student_completed).tolist()
+            )
+        ]
+    }
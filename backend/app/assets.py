@@ -0,0 +1,120 @@
+"""Статические файлы фронтенда, загруженные в память при старте.
+
+Каждый файл заранее сжимается (gzip и br, если установлен пакет brotli) и
+отдаётся со строгим ETag. CSS и JS доступны также по адресам с хешем
+содержимого (css/main.3f2a9c1e0b7d4a65.css): HTML-страницы ссылаются на них,
+и браузер кеширует их без перепроверки. Изменения во фронтенде подхватываются
+после перезапуска сервера.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = Path(os.getenv("FRONTEND_DIR", Path(__file__).resolve().parents[2] / "frontend"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Порядок предпочтения кодировок при согласовании
+ENCODINGS = ("br", "gzip")
+HASHED_EXTENSIONS = {".css", ".js"}
+
+
+class Asset:
+    def __init__(self, content: bytes, media_type: str):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(content).hexdigest()[:16]
+        self.bodies = {"identity": content}
+
+        compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(content, quality=11)
+
+        for encoding, body in compressed.items():
+            if len(body) < len(content):
+                self.bodies[encoding] = body
+
+    def etag(self, encoding: str):
+        """Строгий ETag; у каждого представления (кодировки) он свой"""
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+def hashed_path(path: str, digest: str):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{digest}{extension}"
+
+def accepted_encodings(header: str):
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+class StaticAssets:
+    def __init__(self, root: Path):
+        self.assets = {}
+        self.urls = {}
+        pages = {}
+
+        for file in sorted(root.rglob("*")):
+            if not file.is_file():
+                continue
+            path = file.relative_to(root).as_posix()
+
+            if file.suffix == ".html":
+                pages[path] = file.read_text(encoding="utf-8")
+                continue
+
+            asset = Asset(file.read_bytes(), mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.assets[path] = (asset, REVALIDATE_CACHE_CONTROL)
+
+            if file.suffix in HASHED_EXTENSIONS:
+                self.urls[path] = hashed_path(path, asset.digest)
+                self.assets[self.urls[path]] = (asset, IMMUTABLE_CACHE_CONTROL)
+
+        # Страницы ссылаются на CSS и JS по адресам с хешем
+        for path, html in pages.items():
+            for original, hashed in self.urls.items():
+                html = html.replace(f'"{original}"', f'"{hashed}"')
+            self.assets[path] = (Asset(html.encode("utf-8"), "text/html"), REVALIDATE_CACHE_CONTROL)
+
+    def response(self, request: Request, path: str):
+        """Ответ с подходящей клиенту кодировкой или 304, если его копия актуальна"""
+        entry = self.assets.get(path)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Файл не найден")
+        asset, cache_control = entry
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next(
+            (name for name in ENCODINGS if name in asset.bodies and (name in accepted or "*" in accepted)),
+            "identity"
+        )
+        etag = asset.etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in {value.strip().removeprefix("W/") for value in if_none_match.split(",")}:
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
@@ -1,9 +1,14 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import threading
 import os
 from dotenv import load_dotenv
 
+from .cache import TTLCache
+
 load_dotenv()
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -12,12 +17,62 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# Пользователи, найденные по логину из токена; сбрасывается при изменении пользователей и групп
+principal_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
+
+# bcrypt отпускает GIL, поэтому хватает отдельного пула потоков вне пула обработчиков запросов
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+PASSWORD_IMPORT_PROCESSES = int(os.getenv("PASSWORD_IMPORT_PROCESSES", str(os.cpu_count() or 2)))
+
+# Пул процессов для массового импорта создаётся при первом импорте
+_import_executor = None
+
+class PasswordHashingBusy(Exception):
+    """Все потоки хеширования паролей заняты и очередь заполнена"""
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def _submit_password_task(func, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+
+    future = _password_executor.submit(func, *args)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future
+
+async def verify_password_async(plain_password, hashed_password):
+    """Проверить пароль в пуле хеширования, не блокируя цикл событий"""
+    return await asyncio.wrap_future(_submit_password_task(verify_password, plain_password, hashed_password))
+
+def get_password_hash_bounded(password):
+    """Захешировать пароль в пуле хеширования из синхронного обработчика"""
+    return _submit_password_task(get_password_hash, password).result()
+
+async def hash_passwords(passwords):
+    """Захешировать пачку паролей параллельно в пуле процессов импорта"""
+    global _import_executor
+    if _import_executor is None:
+        _import_executor = ProcessPoolExecutor(max_workers=PASSWORD_IMPORT_PROCESSES)
+
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(_import_executor, get_password_hash, password)
+        for password in passwords
+    ))
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
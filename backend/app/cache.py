@@ -0,0 +1,110 @@
+"""Кеши в памяти процесса и кеш вычисленных результатов с инвалидацией по тегам"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class CacheBackend(ABC):
+    """Хранилище кеша. Общий для нескольких процессов бэкенд (например, Redis)
+    реализует те же методы; значения в нём должны сериализоваться (pickle).
+    """
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, value):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def stats(self):
+        pass
+
+class TTLCache(CacheBackend):
+    """Ограниченный по размеру LRU-кеш в памяти процесса с временем жизни записей"""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Вернуть значение или None, если записи нет или она устарела"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize
+            }
+
+class ResultCache:
+    """Кеш вычисленных ответов с инвалидацией по тегам.
+
+    Теги - имена сущностей из versions.py, версии которых увеличивают изменяющие
+    эндпоинты. Текущие версии тегов входят в ключ записи: после изменения старые
+    записи больше не находятся и вытесняются бэкендом, поэтому инвалидация
+    работает и между процессами, и с общим бэкендом.
+    """
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def key(self, name: str, args, versions):
+        tags = ",".join(f"{tag}:{version}" for tag, version in sorted(versions.items()))
+        return f"{name}:{':'.join(str(arg) for arg in args)}:{tags}"
+
+    async def get_or_compute(self, name: str, args, versions, compute):
+        """Вернуть закешированный результат или вычислить его через await compute()"""
+        key = self.key(name, args, versions)
+        value = self.backend.get(key)
+
+        if value is None:
+            value = await compute()
+            self.backend.set(key, value)
+
+        return value
+
+    def stats(self):
+        return self.backend.stats()
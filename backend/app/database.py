@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from functools import lru_cache
+from typing import Union
 import os
 from dotenv import load_dotenv
 
@@ -8,6 +13,20 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Асинхронный движок для читающих эндпоинтов включается отдельно: DATABASE_ASYNC=true
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url(url: str):
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
@@ -19,6 +38,29 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if DATABASE_ASYNC:
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+    # aiosqlite работает без пула соединений, размеры пула задаются только для серверных БД
+    async_pool_options = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+        "pool_size": int(os.getenv("ASYNC_DATABASE_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("ASYNC_DATABASE_MAX_OVERFLOW", "20")),
+    }
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=False,
+        **async_pool_options
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+ReadSession = Union[Session, AsyncSession]
+
 Base = declarative_base()
 
 def get_db():
@@ -26,4 +68,36 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_read_db():
+    """Сессия для читающих эндпоинтов: асинхронная при DATABASE_ASYNC, иначе обычная"""
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+    else:
+        async with AsyncSessionLocal() as db:
+            yield db
+
+@lru_cache(maxsize=None)
+def _response_adapter(response_model):
+    return TypeAdapter(response_model)
+
+async def run_query(db: ReadSession, func, *args):
+    """Выполнить синхронную функцию запросов, не занимая поток на ожидание БД"""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args)
+    return await run_in_threadpool(func, db, *args)
+
+async def run_db(db: ReadSession, response_model, func, *args):
+    """Выполнить синхронную функцию запросов и собрать из результата ответ.
+
+    Ответ собирается внутри той же сессии, чтобы ленивые связи подгружались до её закрытия.
+    """
+    def load(session: Session):
+        return _response_adapter(response_model).validate_python(func(session, *args), from_attributes=True)
+
+    return await run_query(db, load)
@@ -0,0 +1,110 @@
+"""Публикация событий по каналам и их доставка подписчикам через Server-Sent Events.
+
+Брокер работает в памяти процесса: подписчики получают только события,
+опубликованные в том же процессе. Каждое событие кодируется один раз и
+раскладывается по ограниченным очередям подписчиков. Если клиент не успевает
+читать и его очередь заполнилась, накопленные события отбрасываются и вместо
+них отправляется одно событие resync: клиент заново загружает данные.
+Во время простоя поток шлёт комментарий-heartbeat, чтобы соединение не
+закрывали прокси.
+"""
+import asyncio
+import json
+import os
+import threading
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from .metrics import EVENT_OVERFLOWS, EVENT_SUBSCRIBERS
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_RETRY_MILLISECONDS = 3000
+
+RESYNC = "event: resync\ndata: {}\n\n"
+HEARTBEAT = ": heartbeat\n\n"
+
+
+def format_event(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+class Subscription:
+    """Очередь событий одного клиента; наполняется только в цикле событий, где создана"""
+    def __init__(self, channel, maxsize: int):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            EVENT_OVERFLOWS.inc()
+
+    async def get(self, timeout: float):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+        EVENT_SUBSCRIBERS.dec()
+
+    def has_subscribers(self, channel):
+        with self._lock:
+            return channel in self._channels
+
+    def publish(self, channel, event: str, data):
+        """Отправить событие подписчикам канала; можно вызывать из любого потока"""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        if not subscribers:
+            return
+
+        message = format_event(event, data)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                pass
+
+    async def stream(self, channel, heartbeat: float = EVENT_HEARTBEAT_SECONDS):
+        """Поток SSE канала; подписка действует, пока клиент подключён"""
+        subscription = self.subscribe(channel)
+        try:
+            yield f"retry: {EVENT_RETRY_MILLISECONDS}\n\n"
+            while True:
+                try:
+                    yield await subscription.get(heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.unsubscribe(subscription)
+
+    def response(self, channel):
+        return StreamingResponse(
+            self.stream(channel),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
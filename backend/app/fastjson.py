@@ -0,0 +1,105 @@
+"""Быстрый путь для больших списков: строки из запросов по отдельным столбцам
+собираются в словари той же формы, что и схемы ответа, и кодируются orjson
+без валидации через response_model. Схема OpenAPI по-прежнему строится по
+response_model эндпоинта.
+
+Включается переменной FAST_JSON_RESPONSES=true, если установлен orjson.
+"""
+import os
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import aliased
+
+from . import models
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON_RESPONSES = orjson is not None and \
+    os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def fast_json_response(content, response: Response):
+    """Ответ orjson с заголовками, выставленными зависимостями (например, ETag)"""
+    return ORJSONResponse(content, headers=dict(response.headers))
+
+def user_columns(user=models.User, group=models.Group):
+    return (user.id, user.email, user.login, user.fio, user.role, user.group_id, group.id, group.name)
+
+def user_row(values):
+    """Словарь в форме UserProfile"""
+    user_id, email, login, fio, role, group_id, group_ref, group_name = values
+    return {
+        "id": user_id,
+        "email": email,
+        "login": login,
+        "fio": fio,
+        "role": role,
+        "group_id": group_id,
+        "group": {"id": group_ref, "name": group_name} if group_ref is not None else None
+    }
+
+def group_columns(group=models.Group):
+    return (group.name, group.id, group.created_at)
+
+def group_row(values):
+    """Словарь в форме Group"""
+    name, group_id, created_at = values
+    return {"name": name, "id": group_id, "created_at": created_at}
+
+def course_columns_and_joins():
+    """Столбцы курса с преподавателем и группой и соединения, которые для них нужны"""
+    teacher = aliased(models.User)
+    teacher_group = aliased(models.Group)
+    columns = (
+        models.Course.id,
+        models.Course.name,
+        *user_columns(teacher, teacher_group),
+        *group_columns(models.Group),
+        models.Course.created_at
+    )
+
+    def join(query):
+        return query\
+            .join(teacher, models.Course.teacher_id == teacher.id)\
+            .outerjoin(teacher_group, teacher.group_id == teacher_group.id)\
+            .join(models.Group, models.Course.group_id == models.Group.id)
+
+    return columns, join
+
+USER_WIDTH = len(user_columns())
+GROUP_WIDTH = len(group_columns())
+
+def course_row(values):
+    """Словарь в форме CourseWithDetails без вычисляемых показателей"""
+    teacher_end = 2 + USER_WIDTH
+    group_end = teacher_end + GROUP_WIDTH
+    return {
+        "id": values[0],
+        "name": values[1],
+        "teacher": user_row(values[2:teacher_end]),
+        "group": group_row(values[teacher_end:group_end]),
+        "created_at": values[group_end],
+        "total_tests": 0,
+        "completed_tests": 0,
+        "completion_rate": 0.0,
+        "student_count": 0,
+        "average_progress": 0.0
+    }
+
+def test_columns():
+    return (models.Test.id, models.Test.name, models.Test.course_id, models.Test.created_at)
+
+def test_row(values):
+    """Словарь в форме TestWithCourseAndGroup"""
+    test_id, name, course_id, created_at = values[:4]
+    return {
+        "id": test_id,
+        "name": name,
+        "course_id": course_id,
+        "created_at": created_at,
+        "course": course_row(values[4:])
+    }
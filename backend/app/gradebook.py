@@ -0,0 +1,94 @@
+"""Потоковая выгрузка журнала оценок в CSV или NDJSON.
+
+Результаты читаются серверным курсором пачками по EXPORT_BATCH_SIZE строк и
+сразу отдаются клиенту, поэтому память не растёт с размером выгрузки.
+"""
+import csv
+import io
+import json
+import os
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from . import models
+from .database import SessionLocal
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNS = (
+    "student_id",
+    "student_login",
+    "student_name",
+    "course_id",
+    "course_name",
+    "test_id",
+    "test_name",
+    "score",
+    "completed_at",
+)
+
+
+def gradebook_query(course_ids):
+    return select(
+        models.User.id,
+        models.User.login,
+        models.User.fio,
+        models.Course.id,
+        models.Course.name,
+        models.Test.id,
+        models.Test.name,
+        models.CompletedTest.score,
+        models.CompletedTest.completed_at
+    )\
+        .select_from(models.CompletedTest)\
+        .join(models.User, models.CompletedTest.student_id == models.User.id)\
+        .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
+        .join(models.Course, models.Test.course_id == models.Course.id)\
+        .where(models.Course.id.in_(course_ids))\
+        .order_by(models.Course.id, models.User.id, models.Test.id)
+
+def format_rows(rows, data_format: str):
+    buffer = io.StringIO()
+    values = (
+        (*row[:-1], row[-1].isoformat() if row[-1] is not None else None)
+        for row in rows
+    )
+
+    if data_format == "csv":
+        csv.writer(buffer, lineterminator="\n").writerows(values)
+    else:
+        for row in values:
+            buffer.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+            buffer.write("\n")
+
+    return buffer.getvalue()
+
+def stream_gradebook(course_ids, data_format: str):
+    """Выдавать журнал по курсам кусками текста, по куску на пачку строк"""
+    if data_format == "csv":
+        # BOM, чтобы Excel открывал кириллицу без ручного выбора кодировки
+        yield "\ufeff" + ",".join(COLUMNS) + "\n"
+
+    # Собственная сессия: сессия запроса может закрыться раньше, чем ответ будет отдан
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            gradebook_query(course_ids).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            yield format_rows(rows, data_format)
+    finally:
+        db.close()
+
+def gradebook_response(course_ids, data_format: str, filename: str):
+    return StreamingResponse(
+        stream_gradebook(list(course_ids), data_format),
+        media_type=MEDIA_TYPES[data_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{data_format}"'}
+    )
@@ -1,38 +1,100 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import joinedload
-from sqlalchemy import func
+from sqlalchemy import String, func, and_, or_, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing import List
 import datetime
+import math
 
-from .database import get_db, engine, Base
-from . import models
+from .database import get_db, get_read_db, run_db, run_query, engine, async_engine, Base, ReadSession
+from . import models, rollups
 from .models import User, Group, Course, Test, CompletedTest
 from . import schemas
 from .schemas import (
     UserLogin, Token, UserProfile, Group, Course, Test,
     CompletedTest, StudentProgress, GroupProgress,
-    CompletedTestCreate, CourseWithDetails, TeacherStats, AdminStats, 
+    CompletedTestCreate, CourseWithDetails, TeacherStats, AdminStats, CacheStats,
     TestWithCompletion, TestResult, StudentStats, StudentTestDetail, CourseStatistics, StudentProgress,
-    TestWithStatistics, CourseCreate, TestCreate, GroupBase, TestWithCourse, TestWithCourseAndGroup
+    TestWithStatistics, CourseCreate, TestCreate, GroupBase, TestWithCourse, TestWithCourseAndGroup,
+    UserPage, TestPage, CoursePage, StudentTestDetailPage, UserImportReport, CompletedTestBatchReport,
+    Dashboard, Leaderboard, LeaderboardEntry, ScoreBucket, TestScoreDistribution, CourseScoreDistribution,
+    TeacherAnalytics
+)
+from .user_import import import_users
+from .gradebook import gradebook_response
+from .analytics import load_teacher_analytics
+from .events import EventBroker
+from .cache import ResultCache, TTLCache
+from .metrics import CACHES, MetricsMiddleware, instrument_engine, query_budget, render_metrics
+from .fastjson import (
+    FAST_JSON_RESPONSES, fast_json_response, user_columns, user_row, group_columns, group_row,
+    course_columns_and_joins, course_row, test_columns, test_row
+)
+from .assets import FRONTEND_DIR, StaticAssets
+from .versions import COURSE_RESULTS, course_results, ensure_versions, bump_versions, load_versions, make_etag, etag_matches
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, make_page
+from .auth import (
+    verify_password_async, create_access_token, verify_token, get_password_hash_bounded, principal_cache,
+    PasswordHashingBusy, PASSWORD_HASH_RETRY_AFTER_SECONDS
 )
-from .auth import verify_password, create_access_token, verify_token, get_password_hash
 
 Base.metadata.create_all(bind=engine)
 
+with engine.begin() as connection:
+    ensure_versions(connection)
+
 app = FastAPI(title="Distance Learning System API", version="1.0.0")
 
+static_assets = StaticAssets(FRONTEND_DIR)
+
+MAX_BATCH_RESULTS = int(os.getenv("MAX_BATCH_RESULTS", "1000"))
+
+MAX_SCORE = 10
+SCORE_PERCENTILES = (25, 50, 75, 90)
+
+LEADERBOARD_DEFAULT_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+
+RESULT_CACHE_MAX_SIZE = int(os.getenv("RESULT_CACHE_MAX_SIZE", "4096"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+
+# Каналы событий курсов: результаты студентов для открытой у преподавателя статистики
+course_events = EventBroker()
+
+# Статистика, пересчитываемая только после изменений; теги - сущности из versions.py
+result_cache = ResultCache(TTLCache(RESULT_CACHE_MAX_SIZE, RESULT_CACHE_TTL_SECONDS))
+CACHES.register("result", result_cache)
+CACHES.register("principal", principal_cache)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+@app.exception_handler(PasswordHashingBusy)
+def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервер перегружен, повторите попытку позже"},
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
 
 def get_user_by_login(db: Session, login: str):
     return db.query(User).filter(User.login == login).first()
@@ -40,6 +102,62 @@ def get_user_by_login(db: Session, login: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
+def get_cached_user(db: Session, login: str):
+    """Найти пользователя по логину, используя кеш вместо запроса к БД"""
+    user = principal_cache.get(login)
+
+    if user is None:
+        user = db.query(User)\
+            .options(joinedload(User.group))\
+            .filter(User.login == login)\
+            .first()
+        if not user:
+            return None
+
+        # В кеше хранится отсоединённая копия, в сессию запроса попадает её слияние
+        if user.group is not None:
+            db.expunge(user.group)
+        db.expunge(user)
+        principal_cache.set(login, user)
+
+    return db.merge(user, load=False)
+
+def upsert_completed_tests(db: Session, rows: List[dict]):
+    """Сохранить результаты тестов одним запросом, перезаписывая балл при повторной сдаче"""
+    rollups.record_results(db, rows)
+
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql_insert(models.CompletedTest).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            score=stmt.inserted.score,
+            completed_at=func.now()
+        )
+    elif dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(models.CompletedTest).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.CompletedTest.student_id, models.CompletedTest.test_id],
+            set_={"score": stmt.excluded.score, "completed_at": func.now()}
+        )
+    else:
+        for row in rows:
+            existing = db.query(models.CompletedTest).filter(
+                models.CompletedTest.student_id == row["student_id"],
+                models.CompletedTest.test_id == row["test_id"]
+            ).first()
+
+            if existing:
+                existing.score = row["score"]
+                existing.completed_at = func.now()
+            else:
+                db.add(models.CompletedTest(**row))
+        db.flush()
+        return
+
+    db.execute(stmt)
+
 def get_current_user(request: Request, db: Session = Depends(get_db)):
     auth_header = request.headers.get("Authorization")
     
@@ -65,7 +183,7 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
             detail="Неверный токен"
         )
     
-    user = get_user_by_login(db, login)
+    user = get_cached_user(db, login)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,36 +192,65 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
     
     return user
 
-@app.get("/", response_class=FileResponse)
-async def read_root():
-    return FileResponse("../frontend/index.html")
+def conditional_get(*entities):
+    """Зависимость для GET-эндпоинта: ETag из версий сущностей и 304 при совпадении If-None-Match.
+
+    В именах сущностей можно ссылаться на параметры пути, например COURSE_RESULTS.
+    """
+    async def check_etag(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_user),
+        db: ReadSession = Depends(get_read_db)
+    ):
+        names = [entity.format(**request.path_params) for entity in entities]
+        versions = await run_db(db, Dict[str, int], load_versions, names)
+        etag = make_etag(request, current_user.id, versions)
 
-@app.get("/css/{file_path:path}", response_class=FileResponse)
-async def serve_css(file_path: str):
-    return FileResponse(f"../frontend/css/{file_path}")
+        if etag_matches(request, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
 
-@app.get("/js/{file_path:path}", response_class=FileResponse)
-async def serve_js(file_path: str):
-    return FileResponse(f"../frontend/js/{file_path}")
+        # Те же версии служат тегами для кеша результатов
+        request.state.entity_versions = versions
+        response.headers["ETag"] = etag
+
+    return check_etag
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Метрики запросов и БД в формате Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/")
+async def read_root(request: Request):
+    return static_assets.response(request, "index.html")
+
+@app.get("/css/{file_path:path}")
+async def serve_css(request: Request, file_path: str):
+    return static_assets.response(request, f"css/{file_path}")
+
+@app.get("/js/{file_path:path}")
+async def serve_js(request: Request, file_path: str):
+    return static_assets.response(request, f"js/{file_path}")
 
 @app.get("/main-page")
-def main_page_html():
-    return FileResponse("../frontend/main.html")
+async def main_page_html(request: Request):
+    return static_assets.response(request, "main.html")
 
 @app.post("/auth/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: Session = Depends(get_db)):
     if not (user.login and user.password):
         raise HTTPException(status_code=400, detail="Недостаточно данных")
     
     if "@" in user.login:
-        db_user = get_user_by_email(db, user.login)
+        db_user = await run_in_threadpool(get_user_by_email, db, user.login)
     else:
-        db_user = get_user_by_login(db, user.login)
+        db_user = await run_in_threadpool(get_user_by_login, db, user.login)
     
     if not db_user:
         raise HTTPException(status_code=400, detail="Неверный логин или пароль")
 
-    if not verify_password(user.password, db_user.password_hash):
+    if not await verify_password_async(user.password, db_user.password_hash):
         raise HTTPException(status_code=400, detail="Неверный логин или пароль")
 
     access_token = create_access_token(
@@ -112,85 +259,72 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/auth/me", response_model=UserProfile)
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    auth_header = request.headers.get("Authorization")
-    
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Требуется аутентификация"
-        )
-    
-    token = auth_header.replace("Bearer ", "")
-    payload = verify_token(token)
-    
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Неверный или просроченный токен"
-        )
-    
-    login = payload.get("login")
-    if not login:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Неверный токен"
-        )
-    
-    user = get_user_by_login(db, login)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пользователь не найден"
-        )
-    
-    return user
-
-@app.get("/api/courses/my", response_model=List[CourseWithDetails])
-def get_my_courses(
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
-):
-    """Получить курсы текущего пользователя с деталями"""
-    if current_user.role == "student":
-        courses = db.query(models.Course)\
-            .filter(models.Course.group_id == current_user.group_id)\
-            .options(
-                joinedload(models.Course.teacher),
-                joinedload(models.Course.group)
-            )\
+@app.get("/auth/me", response_model=UserProfile, dependencies=[Depends(conditional_get("users", "groups")), Depends(query_budget(2))])
+def get_me(current_user: User = Depends(get_current_user)):
+    return current_user
+
+def load_group_test_counts(db: Session, group_id: int):
+    """Количество тестов в каждом курсе группы"""
+    return dict(
+        db.query(models.Test.course_id, func.count(models.Test.id))\
+            .join(models.Course, models.Test.course_id == models.Course.id)\
+            .filter(models.Course.group_id == group_id)\
+            .group_by(models.Test.course_id)\
             .all()
+    )
 
-        courses_with_progress = []
-        for course in courses:
-            total_tests = db.query(models.Test)\
-                .filter(models.Test.course_id == course.id)\
-                .count()
-
-            completed_tests = db.query(models.CompletedTest)\
-                .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
-                .filter(
-                    models.CompletedTest.student_id == current_user.id,
-                    models.Test.course_id == course.id
-                )\
-                .count()
-
-            completion_rate = round((completed_tests / total_tests * 100), 1) if total_tests > 0 else 0.0
-            
-            course_dict = {
-                "id": course.id,
-                "name": course.name,
-                "teacher": course.teacher,
-                "group": course.group,
-                "created_at": course.created_at,
-                "total_tests": total_tests,
-                "completed_tests": completed_tests,
-                "completion_rate": completion_rate
-            }
-            courses_with_progress.append(course_dict)
+def load_student_progress(db: Session, student_id: int):
+    """Количество сданных тестов и сумма баллов студента по каждому курсу из агрегатов"""
+    progress = db.query(
+        models.StudentCourseProgress.course_id,
+        models.StudentCourseProgress.completed_count,
+        models.StudentCourseProgress.score_sum
+    )\
+        .filter(models.StudentCourseProgress.student_id == student_id)\
+        .all()
+    return {
+        course_id: (completed_count, int(score_sum))
+        for course_id, completed_count, score_sum in progress
+    }
+
+def load_student_courses(db: Session, current_user: User, tests_by_course, progress_by_course):
+    courses = db.query(models.Course)\
+        .filter(models.Course.group_id == current_user.group_id)\
+        .options(
+            joinedload(models.Course.teacher),
+            joinedload(models.Course.group)
+        )\
+        .all()
+
+    courses_with_progress = []
+    for course in courses:
+        total_tests = tests_by_course.get(course.id, 0)
+        completed_tests = progress_by_course.get(course.id, (0, 0))[0]
+
+        completion_rate = round((completed_tests / total_tests * 100), 1) if total_tests > 0 else 0.0
         
-        return courses_with_progress
+        course_dict = {
+            "id": course.id,
+            "name": course.name,
+            "teacher": course.teacher,
+            "group": course.group,
+            "created_at": course.created_at,
+            "total_tests": total_tests,
+            "completed_tests": completed_tests,
+            "completion_rate": completion_rate
+        }
+        courses_with_progress.append(course_dict)
+    
+    return courses_with_progress
+
+def load_my_courses(db: Session, current_user: User):
+    if current_user.role == "student":
+        return load_student_courses(
+            db,
+            current_user,
+            load_group_test_counts(db, current_user.group_id),
+            load_student_progress(db, current_user.id)
+        )
     
     elif current_user.role == "teacher":
         courses = db.query(models.Course)\
@@ -201,24 +335,39 @@ def get_my_courses(
             )\
             .all()
 
+        # Количество тестов и сданных результатов по всем курсам преподавателя одним запросом
+        course_counts = db.query(
+            models.Test.course_id,
+            func.count(models.Test.id),
+            func.coalesce(func.sum(models.TestProgress.completed_count), 0)
+        )\
+            .join(models.Course, models.Test.course_id == models.Course.id)\
+            .outerjoin(models.TestProgress, models.TestProgress.test_id == models.Test.id)\
+            .filter(models.Course.teacher_id == current_user.id)\
+            .group_by(models.Test.course_id)\
+            .all()
+        counts_by_course = {
+            course_id: (total_tests, int(completed_tests_count))
+            for course_id, total_tests, completed_tests_count in course_counts
+        }
+
+        # Количество студентов в каждой группе преподавателя
+        teacher_group_ids = db.query(models.Course.group_id)\
+            .filter(models.Course.teacher_id == current_user.id)
+        student_counts = db.query(models.User.group_id, func.count(models.User.id))\
+            .filter(
+                models.User.group_id.in_(teacher_group_ids),
+                models.User.role == "student"
+            )\
+            .group_by(models.User.group_id)\
+            .all()
+        students_by_group = dict(student_counts)
+
         courses_with_stats = []
         for course in courses:
-            total_tests = db.query(models.Test)\
-                .filter(models.Test.course_id == course.id)\
-                .count()
-
-            student_count = db.query(models.User)\
-                .filter(
-                    models.User.group_id == course.group_id,
-                    models.User.role == "student"
-                )\
-                .count()
-
-            completed_tests_count = db.query(models.CompletedTest)\
-                .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
-                .filter(models.Test.course_id == course.id)\
-                .count()
-            
+            total_tests, completed_tests_count = counts_by_course.get(course.id, (0, 0))
+            student_count = students_by_group.get(course.group_id, 0)
+
             total_possible_tests = student_count * total_tests
             average_progress = round((completed_tests_count / total_possible_tests * 100), 1) if total_possible_tests > 0 else 0.0
 
@@ -246,20 +395,28 @@ def get_my_courses(
 
         return courses
 
-@app.get("/api/courses/{course_id}/tests")
+@app.get("/api/courses/my", response_model=List[CourseWithDetails], dependencies=[Depends(conditional_get("groups", "users", "courses", "tests", "results")), Depends(query_budget(5))])
+async def get_my_courses(
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить курсы текущего пользователя с деталями"""
+    return await run_db(db, List[CourseWithDetails], load_my_courses, current_user)
+
+@app.get("/api/courses/{course_id}/tests", dependencies=[Depends(conditional_get("users", "courses", "tests")), Depends(query_budget(4))])
 def get_course_tests(course_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Получить тесты курса"""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Курс не найден")
     
     if current_user.role == "student" and course.group_id != current_user.group_id:
         raise HTTPException(status_code=403, detail="Нет доступа к этому курсу")
     
-    tests = db.query(Test).filter(Test.course_id == course_id).all()
+    tests = db.query(models.Test).filter(models.Test.course_id == course_id).all()
     return tests
 
-@app.get("/api/courses/{course_id}/tests-with-completion", response_model=List[TestWithCompletion])
+@app.get("/api/courses/{course_id}/tests-with-completion", response_model=List[TestWithCompletion], dependencies=[Depends(conditional_get("users", "courses", "tests", COURSE_RESULTS)), Depends(query_budget(5))])
 def get_course_tests_with_completion(
     course_id: int,
     current_user: User = Depends(get_current_user),
@@ -283,14 +440,20 @@ def get_course_tests_with_completion(
         .filter(models.Test.course_id == course_id)\
         .all()
 
-    tests_with_completion = []
-    for test in tests:
-        completed_test = db.query(models.CompletedTest)\
+    # Результаты студента по всем тестам курса одним запросом
+    completed_by_test = {
+        completed_test.test_id: completed_test
+        for completed_test in db.query(models.CompletedTest)
+            .join(models.Test, models.CompletedTest.test_id == models.Test.id)
             .filter(
-                models.CompletedTest.test_id == test.id,
+                models.Test.course_id == course_id,
                 models.CompletedTest.student_id == current_user.id
-            )\
-            .first()
+            )
+    }
+
+    tests_with_completion = []
+    for test in tests:
+        completed_test = completed_by_test.get(test.id)
         
         tests_with_completion.append(TestWithCompletion(
             id=test.id,
@@ -304,6 +467,33 @@ def get_course_tests_with_completion(
 
     return tests_with_completion
 
+def publish_course_progress(db: Session, rows: List[dict], test_courses: Dict[int, int]):
+    """Отправить подписчикам курсов новые итоги студента по сохранённым результатам; без подписчиков запросов нет"""
+    student_id = rows[0]["student_id"]
+    course_ids = {test_courses[row["test_id"]] for row in rows}
+    course_ids = [course_id for course_id in course_ids if course_events.has_subscribers(course_id)]
+    if not course_ids:
+        return
+
+    progress = db.query(models.StudentCourseProgress)\
+        .filter(
+            models.StudentCourseProgress.student_id == student_id,
+            models.StudentCourseProgress.course_id.in_(course_ids)
+        )\
+        .all()
+
+    for course_progress in progress:
+        course_events.publish(course_progress.course_id, "result", {
+            "student_id": student_id,
+            "results": [
+                {"test_id": row["test_id"], "score": row["score"]}
+                for row in rows if test_courses[row["test_id"]] == course_progress.course_id
+            ],
+            "completed_tests": course_progress.completed_count,
+            "score_sum": course_progress.score_sum,
+            "last_activity": course_progress.last_activity
+        })
+
 @app.post("/api/completed-tests")
 def submit_test_result(
     completed_test: CompletedTestCreate, 
@@ -322,25 +512,76 @@ def submit_test_result(
     if course.group_id != current_user.group_id:
         raise HTTPException(status_code=403, detail="Нет доступа к этому тесту")
 
-    existing = db.query(models.CompletedTest).filter(
-        models.CompletedTest.student_id == current_user.id,
-        models.CompletedTest.test_id == completed_test.test_id
-    ).first()
-    
-    if existing:
-        existing.score = completed_test.score
-        existing.completed_at = datetime.utcnow()
-    else:
-        new_completed_test = models.CompletedTest(
-            student_id=current_user.id,
-            test_id=completed_test.test_id,
-            score=completed_test.score
-        )
-        db.add(new_completed_test)
+    rows = [{
+        "student_id": current_user.id,
+        "test_id": completed_test.test_id,
+        "score": completed_test.score
+    }]
+    test_courses = {test.id: test.course_id}
+    upsert_completed_tests(db, rows)
+    bump_versions(db, "results", course_results(test.course_id))
     
     db.commit()
+    publish_course_progress(db, rows, test_courses)
     return {"message": "Результат теста сохранен"}
 
+@app.post("/api/completed-tests/batch", response_model=CompletedTestBatchReport)
+def submit_test_results_batch(
+    completed_tests: List[CompletedTestCreate],
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Отправить несколько результатов тестов одним запросом (для студентов)"""
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Только студенты могут отправлять результаты тестов")
+
+    if len(completed_tests) > MAX_BATCH_RESULTS:
+        raise HTTPException(status_code=400, detail=f"Не более {MAX_BATCH_RESULTS} результатов в одном запросе")
+
+    # Курс и его группа для каждого теста из пачки одним запросом
+    test_courses = {
+        test_id: (course_id, group_id)
+        for test_id, course_id, group_id in db.query(models.Test.id, models.Course.id, models.Course.group_id)\
+            .join(models.Course, models.Test.course_id == models.Course.id)\
+            .filter(models.Test.id.in_({item.test_id for item in completed_tests}))
+    }
+    # При повторе теста в пачке сохраняется последний результат
+    latest_index = {item.test_id: index for index, item in enumerate(completed_tests)}
+
+    items = []
+    rows = []
+    for index, item in enumerate(completed_tests):
+        report_item = {"index": index, "test_id": item.test_id, "status": "error"}
+
+        if item.test_id not in test_courses:
+            report_item["detail"] = "Тест не найден"
+        elif test_courses[item.test_id][1] != current_user.group_id:
+            report_item["detail"] = "Нет доступа к этому тесту"
+        elif latest_index[item.test_id] != index:
+            report_item["status"] = "skipped"
+            report_item["detail"] = "Заменён более поздним результатом этого теста"
+        else:
+            report_item["status"] = "saved"
+            rows.append({
+                "student_id": current_user.id,
+                "test_id": item.test_id,
+                "score": item.score
+            })
+
+        items.append(report_item)
+
+    if rows:
+        upsert_completed_tests(db, rows)
+        bump_versions(db, "results", *(course_results(test_courses[row["test_id"]][0]) for row in rows))
+        db.commit()
+        publish_course_progress(db, rows, {test_id: course_id for test_id, (course_id, _) in test_courses.items()})
+
+    return {
+        "saved": len(rows),
+        "failed": sum(1 for item in items if item["status"] == "error"),
+        "items": items
+    }
+
 @app.get("/api/progress/courses/{course_id}")
 def get_course_progress(course_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Получить прогресс по курсу"""
@@ -348,15 +589,7 @@ def get_course_progress(course_id: int, current_user: User = Depends(get_current
     if not course:
         raise HTTPException(status_code=404, detail="Курс не найден")
     
-@app.get("/api/teacher/stats", response_model=TeacherStats)
-def get_teacher_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Получить статистику для преподавателя"""
-    if current_user.role != "teacher":
-        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
-
+def load_teacher_stats(db: Session, current_user: User):
     course_count = db.query(models.Course)\
         .filter(models.Course.teacher_id == current_user.id)\
         .count()
@@ -381,15 +614,22 @@ def get_teacher_stats(
         "student_count": student_count
     }
 
-@app.get("/api/admin/stats", response_model=AdminStats)
-def get_admin_stats(
+@app.get("/api/teacher/stats", response_model=TeacherStats, dependencies=[Depends(conditional_get("users", "courses")), Depends(query_budget(5))])
+async def get_teacher_stats(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить статистику для администратора"""
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+    """Получить статистику для преподавателя"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "teacher_stats", (current_user.id,), request.state.entity_versions,
+        lambda: run_db(db, TeacherStats, load_teacher_stats, current_user)
+    )
 
+def load_admin_stats(db: Session):
     course_count = db.query(models.Course).count()
 
     user_count = db.query(models.User).count()
@@ -402,29 +642,43 @@ def get_admin_stats(
         "group_count": group_count
     }
 
-
-@app.get("/api/student/stats", response_model=StudentStats)
-def get_student_stats(
+@app.get("/api/admin/stats", response_model=AdminStats, dependencies=[Depends(conditional_get("groups", "users", "courses")), Depends(query_budget(5))])
+async def get_admin_stats(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить статистику студента"""
-    if current_user.role != "student":
-        raise HTTPException(status_code=403, detail="Доступно только студентам")
+    """Получить статистику для администратора"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
 
-    completed_tests = db.query(models.CompletedTest)\
-        .filter(models.CompletedTest.student_id == current_user.id)\
-        .all()
+    return await result_cache.get_or_compute(
+        "admin_stats", (), request.state.entity_versions,
+        lambda: run_db(db, AdminStats, load_admin_stats)
+    )
 
-    total_tests = db.query(models.Test)\
-        .join(models.Course, models.Test.course_id == models.Course.id)\
-        .filter(models.Course.group_id == current_user.group_id)\
-        .count()
+@app.get("/api/admin/auth-cache", response_model=CacheStats)
+def get_auth_cache_stats(current_user: User = Depends(get_current_user)):
+    """Получить счётчики кеша пользователей (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
 
-    completed_tests_count = len(completed_tests)
+    return principal_cache.stats()
+
+@app.get("/api/admin/result-cache", response_model=CacheStats)
+def get_result_cache_stats(current_user: User = Depends(get_current_user)):
+    """Получить счётчики кеша статистики (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+
+    return result_cache.stats()
+
+def build_student_stats(tests_by_course, progress_by_course):
+    completed_tests_count = sum(completed_count for completed_count, _ in progress_by_course.values())
+    total_score = sum(score_sum for _, score_sum in progress_by_course.values())
+    total_tests = sum(tests_by_course.values())
 
     if completed_tests_count > 0:
-        total_score = sum(test.score for test in completed_tests)
         average_score = round(total_score / completed_tests_count, 1)
     else:
         average_score = 0.0
@@ -438,52 +692,136 @@ def get_student_stats(
         "completion_percentage": completion_percentage
     }
 
-@app.get("/api/student/completed-tests", response_model=List[StudentTestDetail])
-def get_student_completed_tests(
+def load_student_stats(db: Session, current_user: User):
+    return build_student_stats(
+        load_group_test_counts(db, current_user.group_id),
+        load_student_progress(db, current_user.id)
+    )
+
+@app.get("/api/student/stats", response_model=StudentStats, dependencies=[Depends(conditional_get("users", "courses", "tests", "results")), Depends(query_budget(4))])
+async def get_student_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить детальную информацию о пройденных тестах студента"""
+    """Получить статистику студента"""
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Доступно только студентам")
 
-    completed_tests = db.query(
+    return await run_db(db, StudentStats, load_student_stats, current_user)
+
+def load_student_completed_tests(db: Session, current_user: User, limit: int = DEFAULT_PAGE_SIZE, after=None):
+    # Курсор хранит completed_at в том виде, в каком его вернула база, и сравнивается как строка:
+    # в SQLite дата хранится текстом, а datetime при подстановке получает другой формат
+    completed_at_key = type_coerce(models.CompletedTest.completed_at, String)
+
+    query = db.query(
         models.CompletedTest,
         models.Test,
         models.Course,
-        models.User
+        models.User,
+        completed_at_key
     )\
         .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
         .join(models.Course, models.Test.course_id == models.Course.id)\
         .join(models.User, models.Course.teacher_id == models.User.id)\
-        .filter(models.CompletedTest.student_id == current_user.id)\
-        .order_by(models.CompletedTest.completed_at.desc())\
+        .filter(models.CompletedTest.student_id == current_user.id)
+
+    if after:
+        completed_at, completed_test_id = after
+        query = query.filter(or_(
+            completed_at_key < completed_at,
+            and_(
+                completed_at_key == completed_at,
+                models.CompletedTest.id < completed_test_id
+            )
+        ))
+
+    completed_tests = query\
+        .order_by(models.CompletedTest.completed_at.desc(), models.CompletedTest.id.desc())\
+        .limit(limit + 1)\
         .all()
 
+    page = make_page(completed_tests, limit, lambda row: (str(row[4]), row[0].id))
+
     result = []
-    for completed_test, test, course, teacher in completed_tests:
+    for completed_test, test, course, teacher, _ in page["items"]:
         result.append(StudentTestDetail(
             test_name=test.name,
             course_name=course.name,
             score=completed_test.score,
-            max_score=10,
+            max_score=MAX_SCORE,
             completed_at=completed_test.completed_at,
             teacher_name=teacher.fio
         ))
 
-    return result
+    return {"items": result, "next_cursor": page["next_cursor"]}
 
+@app.get("/api/student/completed-tests", response_model=StudentTestDetailPage, dependencies=[Depends(conditional_get("users", "courses", "tests", "results")), Depends(query_budget(3))])
+async def get_student_completed_tests(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить детальную информацию о пройденных тестах студента"""
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Доступно только студентам")
 
-@app.get("/api/teacher/courses/{course_id}/statistics", response_model=CourseStatistics)
-def get_course_statistics(
-    course_id: int,
+    after = decode_cursor(cursor, str, int) if cursor else None
+    return await run_db(db, StudentTestDetailPage, load_student_completed_tests, current_user, limit, after)
+
+def build_teacher_stats(courses):
+    """Статистика преподавателя из уже посчитанного списка его курсов"""
+    students_by_group = {course["group"].id: course["student_count"] for course in courses}
+    return {
+        "course_count": len(courses),
+        "group_count": len(students_by_group),
+        "student_count": sum(students_by_group.values())
+    }
+
+def load_dashboard(db: Session, current_user: User):
+    dashboard = {"profile": current_user}
+
+    if current_user.role == "student":
+        tests_by_course = load_group_test_counts(db, current_user.group_id)
+        progress_by_course = load_student_progress(db, current_user.id)
+
+        dashboard["courses"] = load_student_courses(db, current_user, tests_by_course, progress_by_course)
+        dashboard["student_stats"] = build_student_stats(tests_by_course, progress_by_course)
+        dashboard["completed_tests"] = load_student_completed_tests(db, current_user)
+    elif current_user.role == "teacher":
+        dashboard["courses"] = load_my_courses(db, current_user)
+        dashboard["teacher_stats"] = build_teacher_stats(dashboard["courses"])
+    else:
+        dashboard["courses"] = load_my_courses(db, current_user)
+        dashboard["admin_stats"] = load_admin_stats(db)
+
+    return dashboard
+
+@app.get("/api/dashboard", response_model=Dashboard, dependencies=[Depends(conditional_get("groups", "users", "courses", "tests", "results")), Depends(query_budget(6))])
+async def get_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить детальную статистику по курсу для преподавателя"""
+    """Получить профиль, курсы и статистику текущего пользователя одним запросом"""
+    return await run_db(db, Dashboard, load_dashboard, current_user)
+
+@app.get("/api/teacher/analytics", response_model=TeacherAnalytics, dependencies=[Depends(conditional_get("groups", "users", "courses", "tests", "results")), Depends(query_budget(6))])
+async def get_teacher_analytics(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить сводную статистику по всем курсам, тестам и студентам преподавателя"""
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Доступно только преподавателям")
 
+    return await result_cache.get_or_compute(
+        "teacher_analytics", (current_user.id,), request.state.entity_versions,
+        lambda: run_db(db, TeacherAnalytics, load_teacher_analytics, current_user.id)
+    )
+
+def load_course_statistics(db: Session, course_id: int, current_user: User):
     course = db.query(models.Course)\
         .filter(
             models.Course.id == course_id,
@@ -501,39 +839,40 @@ def get_course_statistics(
         )\
         .all()
 
-    tests = db.query(models.Test)\
+    total_tests = db.query(models.Test)\
         .filter(models.Test.course_id == course_id)\
+        .count()
+
+    # Количество результатов, сумма баллов и последняя активность каждого студента по курсу
+    student_results = db.query(
+        models.StudentCourseProgress.student_id,
+        models.StudentCourseProgress.completed_count,
+        models.StudentCourseProgress.score_sum,
+        models.StudentCourseProgress.last_activity
+    )\
+        .filter(models.StudentCourseProgress.course_id == course_id)\
         .all()
-    
-    total_tests = len(tests)
+    results_by_student = {
+        student_id: (completed_count, score_sum, last_activity)
+        for student_id, completed_count, score_sum, last_activity in student_results
+    }
+
     student_progress_list = []
     total_completion_rate = 0
     total_score = 0
     active_students = 0
 
     for student in students:
-        completed_tests = db.query(models.CompletedTest)\
-            .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
-            .filter(
-                models.CompletedTest.student_id == student.id,
-                models.Test.course_id == course_id
-            )\
-            .all()
-        
-        completed_count = len(completed_tests)
+        completed_count, score_sum, last_activity = results_by_student.get(student.id, (0, 0, None))
         completion_rate = round((completed_count / total_tests * 100), 1) if total_tests > 0 else 0.0
 
         if completed_count > 0:
-            student_avg_score = sum(test.score for test in completed_tests) / completed_count
+            student_avg_score = int(score_sum) / completed_count
             total_score += student_avg_score
             active_students += 1
         else:
             student_avg_score = 0
 
-        last_activity = None
-        if completed_tests:
-            last_activity = max(test.completed_at for test in completed_tests)
-
         student_progress = StudentProgress(
             student_id=student.id,
             student_name=student.fio,
@@ -563,16 +902,47 @@ def get_course_statistics(
         student_progress=student_progress_list
     )
 
-@app.get("/api/teacher/courses/{course_id}/tests", response_model=List[TestWithStatistics])
-def get_course_tests_with_statistics(
+@app.get("/api/teacher/courses/{course_id}/statistics", response_model=CourseStatistics, dependencies=[Depends(conditional_get("groups", "users", "courses", "tests", COURSE_RESULTS)), Depends(query_budget(7))])
+async def get_course_statistics(
+    request: Request,
+    course_id: int,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить детальную статистику по курсу для преподавателя"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "course_statistics", (course_id, current_user.id), request.state.entity_versions,
+        lambda: run_db(db, CourseStatistics, load_course_statistics, course_id, current_user)
+    )
+
+@app.get("/api/teacher/courses/{course_id}/events")
+def stream_course_events(
     course_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить тесты курса со статистикой для преподавателя"""
+    """Поток Server-Sent Events с результатами студентов курса для преподавателя"""
     if current_user.role != "teacher":
         raise HTTPException(status_code=403, detail="Доступно только преподавателям")
 
+    course = db.query(models.Course.id)\
+        .filter(
+            models.Course.id == course_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    if not course:
+        raise HTTPException(status_code=404, detail="Курс не найден или нет доступа")
+
+    # Сессия закрывается сразу, чтобы не держать соединение с БД всё время потока
+    db.close()
+    return course_events.response(course_id)
+
+def load_course_tests_with_statistics(db: Session, course_id: int, current_user: User):
     course = db.query(models.Course)\
         .filter(
             models.Course.id == course_id,
@@ -587,26 +957,34 @@ def get_course_tests_with_statistics(
         .filter(models.Test.course_id == course_id)\
         .all()
 
-    students = db.query(models.User)\
+    total_students = db.query(models.User)\
         .filter(
             models.User.group_id == course.group_id,
             models.User.role == "student"
         )\
+        .count()
+
+    # Количество результатов и сумма баллов по каждому тесту курса одним запросом
+    test_results = db.query(
+        models.TestProgress.test_id,
+        models.TestProgress.completed_count,
+        models.TestProgress.score_sum
+    )\
+        .join(models.Test, models.TestProgress.test_id == models.Test.id)\
+        .filter(models.Test.course_id == course_id)\
         .all()
-    
-    total_students = len(students)
+    results_by_test = {
+        test_id: (completed_count, score_sum)
+        for test_id, completed_count, score_sum in test_results
+    }
+
     tests_with_stats = []
 
     for test in tests:
-        completed_tests = db.query(models.CompletedTest)\
-            .filter(models.CompletedTest.test_id == test.id)\
-            .all()
-        
-        completed_count = len(completed_tests)
+        completed_count, score_sum = results_by_test.get(test.id, (0, 0))
 
         if completed_count > 0:
-            total_score = sum(ct.score for ct in completed_tests)
-            average_score = round(total_score / completed_count, 1)
+            average_score = round(int(score_sum) / completed_count, 1)
         else:
             average_score = 0.0
 
@@ -625,27 +1003,422 @@ def get_course_tests_with_statistics(
 
     return tests_with_stats
 
-@app.get("/api/admin/users", response_model=List[UserProfile])
-def get_all_users(
+@app.get("/api/teacher/courses/{course_id}/tests", response_model=List[TestWithStatistics], dependencies=[Depends(conditional_get("users", "courses", "tests", COURSE_RESULTS)), Depends(query_budget(6))])
+async def get_course_tests_with_statistics(
+    request: Request,
+    course_id: int,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить тесты курса со статистикой для преподавателя"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "course_tests_statistics", (course_id, current_user.id), request.state.entity_versions,
+        lambda: run_db(db, List[TestWithStatistics], load_course_tests_with_statistics, course_id, current_user)
+    )
+
+def score_distribution(counts: Dict[int, int]):
+    """Гистограмма по баллам и перцентили по ближайшему рангу, вычисленные из количеств"""
+    buckets = {score: 0 for score in range(MAX_SCORE + 1)}
+    for score, count in counts.items():
+        buckets[score] = buckets.get(score, 0) + count
+
+    total = sum(buckets.values())
+    distribution = {
+        "total": total,
+        "average_score": round(sum(score * count for score, count in buckets.items()) / total, 1) if total > 0 else 0.0,
+        "buckets": [ScoreBucket(score=score, count=count) for score, count in sorted(buckets.items())]
+    }
+
+    # Перцентиль p - наименьший балл, до которого включительно набирается p% результатов
+    targets = [(f"p{percentile}", math.ceil(percentile / 100 * total)) for percentile in SCORE_PERCENTILES]
+    cumulative = 0
+    for score, count in sorted(buckets.items()):
+        cumulative += count
+        while total > 0 and targets and cumulative >= targets[0][1]:
+            distribution[targets.pop(0)[0]] = score
+
+    return distribution
+
+def load_score_counts(db: Session, test_ids: List[int]):
+    """Количество результатов по тесту и баллу одним GROUP BY по индексу (test_id, score)"""
+    rows = db.query(models.CompletedTest.test_id, models.CompletedTest.score, func.count())\
+        .filter(models.CompletedTest.test_id.in_(test_ids))\
+        .group_by(models.CompletedTest.test_id, models.CompletedTest.score)\
+        .all()
+
+    counts_by_test = {}
+    for test_id, score, count in rows:
+        counts_by_test.setdefault(test_id, {})[score] = count
+    return counts_by_test
+
+def load_test_score_distribution(db: Session, test_id: int, current_user: User):
+    test = db.query(models.Test)\
+        .join(models.Course, models.Test.course_id == models.Course.id)\
+        .filter(
+            models.Test.id == test_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    if not test:
+        raise HTTPException(status_code=404, detail="Тест не найден или нет доступа")
+
+    counts = load_score_counts(db, [test_id]).get(test_id, {})
+
+    return TestScoreDistribution(test_id=test.id, test_name=test.name, **score_distribution(counts))
+
+@app.get("/api/teacher/tests/{test_id}/score-distribution", response_model=TestScoreDistribution, dependencies=[Depends(conditional_get("courses", "tests", "results")), Depends(query_budget(4))])
+async def get_test_score_distribution(
+    request: Request,
+    test_id: int,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить распределение баллов и перцентили по тесту"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "test_score_distribution", (test_id, current_user.id), request.state.entity_versions,
+        lambda: run_db(db, TestScoreDistribution, load_test_score_distribution, test_id, current_user)
+    )
+
+def load_course_score_distribution(db: Session, course_id: int, current_user: User):
+    course = db.query(models.Course)\
+        .filter(
+            models.Course.id == course_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    if not course:
+        raise HTTPException(status_code=404, detail="Курс не найден или нет доступа")
+
+    tests = db.query(models.Test.id, models.Test.name)\
+        .filter(models.Test.course_id == course_id)\
+        .order_by(models.Test.id)\
+        .all()
+
+    counts_by_test = load_score_counts(db, [test_id for test_id, _ in tests])
+
+    # Гистограмма курса - сумма гистограмм его тестов
+    course_counts = {}
+    test_distributions = []
+    for test_id, test_name in tests:
+        counts = counts_by_test.get(test_id, {})
+        for score, count in counts.items():
+            course_counts[score] = course_counts.get(score, 0) + count
+        test_distributions.append(TestScoreDistribution(test_id=test_id, test_name=test_name, **score_distribution(counts)))
+
+    return CourseScoreDistribution(
+        course_id=course.id,
+        course_name=course.name,
+        tests=test_distributions,
+        **score_distribution(course_counts)
+    )
+
+@app.get("/api/teacher/courses/{course_id}/score-distribution", response_model=CourseScoreDistribution, dependencies=[Depends(conditional_get("users", "courses", "tests", COURSE_RESULTS)), Depends(query_budget(5))])
+async def get_course_score_distribution(
+    request: Request,
+    course_id: int,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить распределение баллов и перцентили по курсу и каждому его тесту"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "course_score_distribution", (course_id, current_user.id), request.state.entity_versions,
+        lambda: run_db(db, CourseScoreDistribution, load_course_score_distribution, course_id, current_user)
+    )
+
+def leaderboard_entry(rank: int, student_id: int, fio: str, login: str, completed_count: int, score_sum: int):
+    completed_count, score_sum = int(completed_count or 0), int(score_sum or 0)
+    return LeaderboardEntry(
+        rank=rank,
+        student_id=student_id,
+        student_name=fio,
+        student_login=login,
+        completed_tests=completed_count,
+        total_score=score_sum,
+        average_score=round(score_sum / completed_count, 1) if completed_count > 0 else 0.0
+    )
+
+def load_group_student_count(db: Session, group_id: int):
+    return db.query(func.count(models.User.id))\
+        .filter(
+            models.User.group_id == group_id,
+            models.User.role == "student"
+        )\
+        .scalar()
+
+def load_leaderboard_entries(db: Session, progress, scope, limit: int):
+    """Первые места рейтинга по индексу (..., score_sum, student_id) агрегата в обратном порядке"""
+    top = db.query(progress.student_id, models.User.fio, models.User.login, progress.completed_count, progress.score_sum)\
+        .join(models.User, models.User.id == progress.student_id)\
+        .filter(scope)\
+        .order_by(progress.score_sum.desc(), progress.student_id.desc())\
+        .limit(limit)\
+        .all()
+
+    # Равные баллы делят место: место - номер первой строки с таким баллом
+    entries = []
+    for position, (row_student_id, fio, login, completed_count, score_sum) in enumerate(top, start=1):
+        rank = entries[-1].rank if entries and entries[-1].total_score == score_sum else position
+        entries.append(leaderboard_entry(rank, row_student_id, fio, login, completed_count, score_sum))
+
+    return entries
+
+def load_leaderboard_rank(db: Session, progress, scope, score_sum: int):
+    """Место студента: число студентов с большим баллом плюс один.
+
+    Считается по диапазону того же индекса без сортировки, но стоимость растёт
+    с числом студентов выше: для последних мест читается почти весь рейтинг.
+    """
+    ahead = db.query(func.count(progress.student_id))\
+        .join(models.User, models.User.id == progress.student_id)\
+        .filter(scope, progress.score_sum > score_sum)\
+        .scalar()
+    return ahead + 1
+
+def load_course_leaderboard(db: Session, course_id: int, current_user: User, limit: int, student_id: Optional[int]):
+    course = db.query(models.Course)\
+        .filter(
+            models.Course.id == course_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    if not course:
+        raise HTTPException(status_code=404, detail="Курс не найден или нет доступа")
+
+    progress = models.StudentCourseProgress
+    in_course_group = and_(
+        progress.course_id == course_id,
+        models.User.group_id == course.group_id,
+        models.User.role == "student"
+    )
+
+    entries = load_leaderboard_entries(db, progress, in_course_group, limit)
+
+    student_entry = None
+    if student_id is not None:
+        student = db.query(models.User.id, models.User.fio, models.User.login, progress.completed_count, progress.score_sum)\
+            .outerjoin(progress, and_(progress.student_id == models.User.id, progress.course_id == course_id))\
+            .filter(
+                models.User.id == student_id,
+                models.User.group_id == course.group_id,
+                models.User.role == "student"
+            )\
+            .first()
+
+        if not student:
+            raise HTTPException(status_code=404, detail="Студент не найден в группе курса")
+
+        student_entry = leaderboard_entry(load_leaderboard_rank(db, progress, in_course_group, student.score_sum or 0), *student)
+
+    return Leaderboard(
+        total_students=load_group_student_count(db, course.group_id),
+        entries=entries,
+        student=student_entry
+    )
+
+@app.get("/api/teacher/courses/{course_id}/leaderboard", response_model=Leaderboard, dependencies=[Depends(conditional_get("users", "courses", COURSE_RESULTS)), Depends(query_budget(7))])
+async def get_course_leaderboard(
+    request: Request,
+    course_id: int,
+    limit: int = Query(LEADERBOARD_DEFAULT_SIZE, ge=1, le=LEADERBOARD_MAX_SIZE),
+    student_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить первые места рейтинга курса по сумме баллов и место студента"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "course_leaderboard", (course_id, current_user.id, limit, student_id), request.state.entity_versions,
+        lambda: run_db(db, Leaderboard, load_course_leaderboard, course_id, current_user, limit, student_id)
+    )
+
+def load_group_leaderboard(db: Session, group_id: int, current_user: User, limit: int, student_id: Optional[int]):
+    teaches_group = db.query(models.Course.id)\
+        .filter(
+            models.Course.group_id == group_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    if not teaches_group:
+        raise HTTPException(status_code=404, detail="Группа не найдена или нет доступа")
+
+    # Суммы студентов по курсам преподавателя в группе хранятся в агрегате со своим индексом рейтинга
+    progress = models.StudentGroupProgress
+    in_group = and_(
+        progress.group_id == group_id,
+        progress.teacher_id == current_user.id,
+        models.User.group_id == group_id,
+        models.User.role == "student"
+    )
+
+    entries = load_leaderboard_entries(db, progress, in_group, limit)
+
+    student_entry = None
+    if student_id is not None:
+        student = db.query(models.User.id, models.User.fio, models.User.login, progress.completed_count, progress.score_sum)\
+            .outerjoin(progress, and_(
+                progress.student_id == models.User.id,
+                progress.group_id == group_id,
+                progress.teacher_id == current_user.id
+            ))\
+            .filter(
+                models.User.id == student_id,
+                models.User.group_id == group_id,
+                models.User.role == "student"
+            )\
+            .first()
+
+        if not student:
+            raise HTTPException(status_code=404, detail="Студент не найден в группе")
+
+        student_entry = leaderboard_entry(load_leaderboard_rank(db, progress, in_group, student.score_sum or 0), *student)
+
+    return Leaderboard(
+        total_students=load_group_student_count(db, group_id),
+        entries=entries,
+        student=student_entry
+    )
+
+@app.get("/api/teacher/groups/{group_id}/leaderboard", response_model=Leaderboard, dependencies=[Depends(conditional_get("users", "courses", "results")), Depends(query_budget(7))])
+async def get_group_leaderboard(
+    request: Request,
+    group_id: int,
+    limit: int = Query(LEADERBOARD_DEFAULT_SIZE, ge=1, le=LEADERBOARD_MAX_SIZE),
+    student_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить рейтинг группы по сумме баллов за курсы преподавателя и место студента"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    return await result_cache.get_or_compute(
+        "group_leaderboard", (group_id, current_user.id, limit, student_id), request.state.entity_versions,
+        lambda: run_db(db, Leaderboard, load_group_leaderboard, group_id, current_user, limit, student_id)
+    )
+
+@app.get("/api/teacher/courses/{course_id}/gradebook")
+def export_course_gradebook(
+    course_id: int,
+    data_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить всех пользователей (только для администраторов)"""
-    if current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+    """Выгрузить журнал оценок курса потоком в CSV или NDJSON"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
 
-    users = db.query(User).options(joinedload(User.group)).all()
-    return users
+    course = db.query(models.Course.id)\
+        .filter(
+            models.Course.id == course_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
 
-@app.get("/api/groups", response_model=List[Group])
-def get_all_groups(
+    if not course:
+        raise HTTPException(status_code=404, detail="Курс не найден или нет доступа")
+
+    # Выгрузка читает своей сессией; соединение запроса не держится на время потока
+    db.close()
+    return gradebook_response([course_id], data_format, f"gradebook-course-{course_id}")
+
+@app.get("/api/teacher/groups/{group_id}/gradebook")
+def export_group_gradebook(
+    group_id: int,
+    data_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить все группы"""
+    """Выгрузить журнал оценок группы по курсам преподавателя потоком в CSV или NDJSON"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="Доступно только преподавателям")
+
+    course_ids = [
+        course_id for (course_id,) in db.query(models.Course.id)
+            .filter(
+                models.Course.group_id == group_id,
+                models.Course.teacher_id == current_user.id
+            )
+    ]
+
+    if not course_ids:
+        raise HTTPException(status_code=404, detail="Группа не найдена или нет доступа")
+
+    # Выгрузка читает своей сессией; соединение запроса не держится на время потока
+    db.close()
+    return gradebook_response(course_ids, data_format, f"gradebook-group-{group_id}")
+
+def load_all_users(db: Session, limit: int, after_id: Optional[int] = None, role: Optional[str] = None):
+    query = db.query(User).options(joinedload(User.group))
+    if role:
+        query = query.filter(User.role == role)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    users = query.order_by(User.id).limit(limit + 1).all()
+    return make_page(users, limit, lambda user: (user.id,))
+
+def load_user_rows(db: Session, limit: int, after_id: Optional[int] = None, role: Optional[str] = None):
+    query = db.query(*user_columns())\
+        .outerjoin(models.Group, User.group_id == models.Group.id)
+    if role:
+        query = query.filter(User.role == role)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    rows = query.order_by(User.id).limit(limit + 1).all()
+    return make_page([user_row(row) for row in rows], limit, lambda user: (user["id"],))
+
+@app.get("/api/admin/users", response_model=UserPage, dependencies=[Depends(conditional_get("groups", "users")), Depends(query_budget(3))])
+async def get_all_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    role: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить пользователей постранично (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    if FAST_JSON_RESPONSES:
+        return fast_json_response(await run_query(db, load_user_rows, limit, after_id, role), response)
+    return await run_db(db, UserPage, load_all_users, limit, after_id, role)
+
+def load_all_groups(db: Session):
     groups = db.query(models.Group).all()
     return groups
 
+def load_group_rows(db: Session):
+    return [group_row(row) for row in db.query(*group_columns())]
+
+@app.get("/api/groups", response_model=List[Group], dependencies=[Depends(conditional_get("groups")), Depends(query_budget(3))])
+async def get_all_groups(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: ReadSession = Depends(get_read_db)
+):
+    """Получить все группы"""
+    if FAST_JSON_RESPONSES:
+        return fast_json_response(await run_query(db, load_group_rows), response)
+    return await run_db(db, List[Group], load_all_groups)
+
 @app.post("/api/admin/users", response_model=UserProfile)
 def create_user(
     user_data: dict,
@@ -663,7 +1436,7 @@ def create_user(
     if existing_user:
         raise HTTPException(status_code=400, detail="Пользователь с таким логином или email уже существует")
 
-    hashed_password = get_password_hash(user_data["password"])
+    hashed_password = get_password_hash_bounded(user_data["password"])
     
     new_user = User(
         login=user_data["login"],
@@ -675,11 +1448,32 @@ def create_user(
     )
     
     db.add(new_user)
+    bump_versions(db, "users")
     db.commit()
     db.refresh(new_user)
     
     return new_user
 
+@app.post("/api/admin/users/import", response_model=UserImportReport)
+async def import_users_bulk(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Массово создать пользователей из CSV или NDJSON (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Доступно только администраторам")
+
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        data_format = "csv"
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        data_format = "ndjson"
+    else:
+        raise HTTPException(status_code=415, detail="Ожидается text/csv или application/x-ndjson")
+
+    return await import_users(request, db, data_format)
+
 @app.put("/api/admin/users/{user_id}", response_model=UserProfile)
 def update_user(
     user_id: int,
@@ -703,6 +1497,8 @@ def update_user(
     if existing_user:
         raise HTTPException(status_code=400, detail="Пользователь с таким логином или email уже существует")
 
+    previous_login = user.login
+
     user.login = user_data["login"]
     user.email = user_data["email"]
     user.fio = user_data["fio"]
@@ -710,9 +1506,13 @@ def update_user(
     user.group_id = user_data.get("group_id")
 
     if user_data.get("password"):
-        user.password_hash = get_password_hash(user_data["password"])
-    
+        user.password_hash = get_password_hash_bounded(user_data["password"])
+
+    bump_versions(db, "users")
     db.commit()
+    # После фиксации: запрос, пришедший во время хеширования пароля, не вернёт в кеш старую запись
+    principal_cache.delete(previous_login)
+    principal_cache.delete(user_data["login"])
     db.refresh(user)
     
     return user
@@ -735,8 +1535,15 @@ def delete_user(
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
     try:
+        progress_scope = rollups.progress_scope_for_user(db, user_id)
+        login = user.login
+
         db.delete(user)
+        db.flush()
+        rollups.refresh_progress(db, **progress_scope)
+        bump_versions(db, "users", "results")
         db.commit()
+        principal_cache.delete(login)
         
         return {"message": "Пользователь удален"}
         
@@ -744,17 +1551,19 @@ def delete_user(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при удалении пользователя: {str(e)}")
         
-@app.get("/api/admin/groups", response_model=List[Group])
-def get_all_groups_admin(
+@app.get("/api/admin/groups", response_model=List[Group], dependencies=[Depends(conditional_get("groups")), Depends(query_budget(3))])
+async def get_all_groups_admin(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
     """Получить все группы (для администратора)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Доступно только администраторам")
-    
-    groups = db.query(models.Group).all()
-    return groups
+
+    if FAST_JSON_RESPONSES:
+        return fast_json_response(await run_query(db, load_group_rows), response)
+    return await run_db(db, List[Group], load_all_groups)
 
 @app.post("/api/admin/groups", response_model=Group)
 def create_group(
@@ -772,6 +1581,7 @@ def create_group(
     
     new_group = models.Group(name=group_data.name)
     db.add(new_group)
+    bump_versions(db, "groups")
     db.commit()
     db.refresh(new_group)
     
@@ -801,8 +1611,10 @@ def update_group(
         raise HTTPException(status_code=400, detail="Группа с таким названием уже существует")
     
     group.name = group_data.name
+    bump_versions(db, "groups")
     db.commit()
     db.refresh(group)
+    principal_cache.clear()
     
     return group
 
@@ -824,7 +1636,9 @@ def delete_group(
         db.query(models.User).filter(models.User.group_id == group_id).update({"group_id": None})
 
         db.delete(group)
+        bump_versions(db, "groups", "users")
         db.commit()
+        principal_cache.clear()
         
         return {"message": "Группа удалена"}
         
@@ -832,23 +1646,46 @@ def delete_group(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при удалении группы: {str(e)}")
 
-@app.get("/api/admin/tests", response_model=List[TestWithCourseAndGroup])
-def get_all_tests(
+def load_all_tests(db: Session, limit: int, after_id: Optional[int] = None):
+    query = db.query(models.Test)\
+        .options(
+            joinedload(models.Test.course).joinedload(models.Course.group),
+            joinedload(models.Test.course).joinedload(models.Course.teacher)
+        )
+    if after_id is not None:
+        query = query.filter(models.Test.id > after_id)
+
+    tests = query.order_by(models.Test.id).limit(limit + 1).all()
+    return make_page(tests, limit, lambda test: (test.id,))
+
+def load_test_rows(db: Session, limit: int, after_id: Optional[int] = None):
+    course_columns, join_course = course_columns_and_joins()
+    query = join_course(
+        db.query(*test_columns(), *course_columns)
+            .join(models.Course, models.Test.course_id == models.Course.id)
+    )
+    if after_id is not None:
+        query = query.filter(models.Test.id > after_id)
+
+    rows = query.order_by(models.Test.id).limit(limit + 1).all()
+    return make_page([test_row(row) for row in rows], limit, lambda test: (test["id"],))
+
+@app.get("/api/admin/tests", response_model=TestPage, dependencies=[Depends(conditional_get("groups", "users", "courses", "tests")), Depends(query_budget(3))])
+async def get_all_tests(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить все тесты с информацией о курсах и группах (только для администраторов)"""
+    """Получить тесты с информацией о курсах и группах постранично (только для администраторов)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Доступно только администраторам")
 
-    tests = db.query(models.Test)\
-        .options(
-            joinedload(models.Test.course).joinedload(models.Course.group),
-            joinedload(models.Test.course).joinedload(models.Course.teacher)
-        )\
-        .all()
-
-    return tests
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    if FAST_JSON_RESPONSES:
+        return fast_json_response(await run_query(db, load_test_rows, limit, after_id), response)
+    return await run_db(db, TestPage, load_all_tests, limit, after_id)
 
 @app.post("/api/admin/tests")
 def create_test(
@@ -866,6 +1703,7 @@ def create_test(
     )
     
     db.add(new_test)
+    bump_versions(db, "tests")
     db.commit()
     db.refresh(new_test)
     
@@ -886,9 +1724,15 @@ def update_test(
     if not test:
         raise HTTPException(status_code=404, detail="Тест не найден")
     
+    previous_course_id = test.course_id
     test.name = test_data["name"]
     test.course_id = test_data["course_id"]
-    
+
+    if test.course_id != previous_course_id:
+        db.flush()
+        rollups.refresh_progress(db, course_ids=[previous_course_id, test.course_id])
+
+    bump_versions(db, "tests")
     db.commit()
     db.refresh(test)
     
@@ -919,27 +1763,50 @@ def delete_test(
         )
     
     db.delete(test)
+    db.flush()
+    rollups.refresh_progress(db, test_ids=[test_id])
+    bump_versions(db, "tests")
     db.commit()
     
     return {"message": "Тест удален"}
 
-@app.get("/api/admin/courses", response_model=List[CourseWithDetails])
-def get_all_courses(
+def load_all_courses(db: Session, limit: int, after_id: Optional[int] = None):
+    query = db.query(models.Course)\
+        .options(
+            joinedload(models.Course.teacher),
+            joinedload(models.Course.group)
+        )
+    if after_id is not None:
+        query = query.filter(models.Course.id > after_id)
+
+    courses = query.order_by(models.Course.id).limit(limit + 1).all()
+    return make_page(courses, limit, lambda course: (course.id,))
+
+def load_course_rows(db: Session, limit: int, after_id: Optional[int] = None):
+    course_columns, join_course = course_columns_and_joins()
+    query = join_course(db.query(*course_columns))
+    if after_id is not None:
+        query = query.filter(models.Course.id > after_id)
+
+    rows = query.order_by(models.Course.id).limit(limit + 1).all()
+    return make_page([course_row(row) for row in rows], limit, lambda course: (course["id"],))
+
+@app.get("/api/admin/courses", response_model=CoursePage, dependencies=[Depends(conditional_get("groups", "users", "courses")), Depends(query_budget(3))])
+async def get_all_courses(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: ReadSession = Depends(get_read_db)
 ):
-    """Получить все курсы (только для администраторов)"""
+    """Получить курсы постранично (только для администраторов)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Доступно только администраторам")
 
-    courses = db.query(models.Course)\
-        .options(
-            joinedload(models.Course.teacher),
-            joinedload(models.Course.group)
-        )\
-        .all()
-
-    return courses
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    if FAST_JSON_RESPONSES:
+        return fast_json_response(await run_query(db, load_course_rows, limit, after_id), response)
+    return await run_db(db, CoursePage, load_all_courses, limit, after_id)
 
 @app.post("/api/admin/courses", response_model=Course)
 def create_course(
@@ -969,6 +1836,7 @@ def create_course(
     )
     
     db.add(new_course)
+    bump_versions(db, "courses")
     db.commit()
     db.refresh(new_course)
     
@@ -1000,10 +1868,18 @@ def update_course(
     if not group:
         raise HTTPException(status_code=404, detail="Группа не найдена")
     
+    previous_teacher_id, previous_group_id = course.teacher_id, course.group_id
+
     course.name = course_data.name
     course.teacher_id = course_data.teacher_id
     course.group_id = course_data.group_id
-    
+
+    if (course.teacher_id, course.group_id) != (previous_teacher_id, previous_group_id):
+        # Результаты курса переходят в суммы другой группы или другого преподавателя
+        db.flush()
+        rollups.refresh_progress(db, teacher_ids=[previous_teacher_id, course.teacher_id])
+
+    bump_versions(db, "courses")
     db.commit()
     db.refresh(course)
     
@@ -1024,7 +1900,12 @@ def delete_course(
         raise HTTPException(status_code=404, detail="Курс не найден")
     
     try:
+        progress_scope = rollups.progress_scope_for_course(db, course_id)
+
         db.delete(course)
+        db.flush()
+        rollups.refresh_progress(db, **progress_scope)
+        bump_versions(db, "courses", "tests", "results")
         db.commit()
         
         return {"message": "Курс удален"}
@@ -0,0 +1,264 @@
+"""Метрики запросов и базы данных в текстовом формате Prometheus.
+
+MetricsMiddleware измеряет время, число одновременных запросов и коды ответов
+по шаблону маршрута, а обработчики событий движка SQLAlchemy считают запросы
+к БД и время их выполнения в рамках текущего HTTP-запроса. Счётчики кешей,
+зарегистрированных через CACHES.register, читаются при каждой выдаче. Значения
+отдаются эндпоинтом /metrics.
+
+Маршрут может объявить бюджет запросов к БД зависимостью query_budget; при
+QUERY_BUDGET_WARNINGS=true превышение бюджета пишется в лог и считается в метриках.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+QUERY_BUDGET_WARNINGS = os.getenv("QUERY_BUDGET_WARNINGS", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+# [число запросов к БД, время в БД] для текущего HTTP-запроса
+_db_usage = ContextVar("db_usage", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_value(labels, value) for labels, value in items)
+        return "\n".join(lines)
+
+    def _render_value(self, labels, value):
+        return f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * len(self.buckets), 0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self._values.items())
+
+        names = (*self.label_names, "le")
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, (*labels, bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, (*labels, '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return "\n".join(lines)
+
+class CacheStats:
+    """Счётчики попаданий, промахов и вытеснений кешей, читаемые из их stats() при выдаче метрик"""
+    METRICS = (
+        ("cache_hits_total", "counter", "hits", "Попадания в кеш"),
+        ("cache_misses_total", "counter", "misses", "Промахи кеша"),
+        ("cache_evictions_total", "counter", "evictions", "Вытеснения из кеша по размеру"),
+        ("cache_entries", "gauge", "size", "Записи в кеше"),
+        ("cache_max_entries", "gauge", "maxsize", "Наибольшее число записей в кеше"),
+    )
+
+    def __init__(self):
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, cache):
+        with self._lock:
+            self._caches[name] = cache
+
+    def render(self):
+        with self._lock:
+            caches = sorted(self._caches.items())
+        stats = [(name, cache.stats()) for name, cache in caches]
+
+        lines = []
+        for metric_name, kind, field, documentation in self.METRICS:
+            lines.extend([f"# HELP {metric_name} {documentation}", f"# TYPE {metric_name} {kind}"])
+            lines.extend(
+                f"{metric_name}{_format_labels(('cache',), (name,))} {values[field]}"
+                for name, values in stats if field in values
+            )
+        return "\n".join(lines)
+
+REQUESTS = Counter("http_requests_total", "HTTP-запросы по маршруту и коду ответа", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route"))
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP-запросы в обработке", ("method",))
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "Число запросов к БД за HTTP-запрос", ("method", "route"), STATEMENT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram("http_request_db_duration_seconds", "Время в БД за HTTP-запрос", ("method", "route"))
+QUERY_BUDGET_EXCEEDED = Counter(
+    "http_request_query_budget_exceeded_total", "HTTP-запросы сверх бюджета запросов к БД", ("method", "route")
+)
+EVENT_SUBSCRIBERS = Gauge("event_stream_subscribers", "Подключённые подписчики потоков событий")
+EVENT_OVERFLOWS = Counter("event_stream_overflows_total", "Переполнения очереди медленного подписчика")
+DB_STATEMENTS = Counter("db_statements_total", "Запросы к БД")
+DB_TIME = Counter("db_statement_duration_seconds_total", "Суммарное время запросов к БД")
+CACHES = CacheStats()
+
+REGISTRY = (
+    REQUESTS,
+    REQUEST_LATENCY,
+    REQUESTS_IN_PROGRESS,
+    REQUEST_STATEMENTS,
+    REQUEST_DB_TIME,
+    QUERY_BUDGET_EXCEEDED,
+    EVENT_SUBSCRIBERS,
+    EVENT_OVERFLOWS,
+    DB_STATEMENTS,
+    DB_TIME,
+    CACHES,
+)
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_STATEMENTS.inc()
+    DB_TIME.inc(amount=elapsed)
+
+    usage = _db_usage.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+def instrument_engine(engine):
+    """Подписаться на выполнение запросов движка (для асинхронного - передать sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class QueryCounter:
+    """Счётчик всех запросов движка внутри блока with (для проверочных скриптов)"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "after_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "after_cursor_execute", self._count)
+
+def query_budget(limit: int):
+    """Зависимость маршрута: сколько запросов к БД допустимо за один HTTP-запрос"""
+    async def declare_query_budget(request: Request):
+        request.state.query_budget = limit
+
+    declare_query_budget.query_budget = limit
+    return declare_query_budget
+
+class MetricsMiddleware:
+    """ASGI-middleware: время, коды ответов и запросы к БД по шаблону маршрута"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        usage = [0, 0.0]
+        token = _db_usage.set(usage)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec(method)
+            _db_usage.reset(token)
+
+            # Шаблон маршрута, а не путь, чтобы число рядов не росло с числом id
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+
+            REQUESTS.inc(method, route_path, status_code)
+            REQUEST_LATENCY.observe(elapsed, method, route_path)
+            REQUEST_STATEMENTS.observe(usage[0], method, route_path)
+            REQUEST_DB_TIME.observe(usage[1], method, route_path)
+
+            budget = scope.get("state", {}).get("query_budget")
+            if QUERY_BUDGET_WARNINGS and budget is not None and usage[0] > budget:
+                QUERY_BUDGET_EXCEEDED.inc(method, route_path)
+                logger.warning(
+                    "%s %s: %d запросов к БД при бюджете %d", method, route_path, usage[0], budget
+                )
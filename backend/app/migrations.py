@@ -0,0 +1,86 @@
+"""Миграции схемы для уже существующих баз данных.
+
+Base.metadata.create_all создаёт только отсутствующие таблицы, поэтому новые
+индексы на существующих таблицах добавляются здесь, а заменённые ими удаляются.
+Запуск из каталога backend:
+
+    python -m app.migrations
+"""
+from sqlalchemy import MetaData, Table, inspect, text
+
+from .database import SessionLocal, engine
+from . import models, rollups
+from .versions import ensure_versions
+
+# Индексы, которые модели больше не объявляют: их покрывают индексы с теми же первыми столбцами
+OBSOLETE_INDEXES = {
+    "completed_tests": ("ix_completed_tests_test_id", "ix_completed_tests_test_score"),
+}
+
+
+def remove_duplicate_completed_tests(connection):
+    """Удалить повторные результаты одного студента по одному тесту, оставив последний"""
+    result = connection.execute(text("""
+        DELETE FROM completed_tests
+        WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MAX(id) AS keep_id
+                FROM completed_tests
+                GROUP BY student_id, test_id
+            ) AS latest
+        )
+    """))
+    return result.rowcount
+
+def create_missing_indexes(connection, model):
+    """Создать индексы модели, которых ещё нет в существующей таблице"""
+    existing = {index["name"] for index in inspect(connection).get_indexes(model.__tablename__)}
+    created = []
+
+    for index in model.__table__.indexes:
+        if index.name not in existing:
+            index.create(connection)
+            created.append(index.name)
+
+    return created
+
+def drop_obsolete_indexes(connection, model):
+    """Удалить из существующей таблицы устаревшие индексы модели"""
+    obsolete = OBSOLETE_INDEXES.get(model.__tablename__, ())
+    table = Table(model.__tablename__, MetaData(), autoload_with=connection)
+    dropped = []
+
+    for index in table.indexes:
+        if index.name in obsolete:
+            index.drop(connection)
+            dropped.append(index.name)
+
+    return dropped
+
+def migrate():
+    models.Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        removed = remove_duplicate_completed_tests(connection)
+        print(f"Удалено повторных результатов: {removed}")
+
+        for model in (models.CompletedTest, models.StudentCourseProgress):
+            for name in create_missing_indexes(connection, model):
+                print(f"Создан индекс {name}")
+            # Удаляются после создания замены: внешнему ключу на MySQL индекс нужен всегда
+            for name in drop_obsolete_indexes(connection, model):
+                print(f"Удалён индекс {name}")
+
+        ensure_versions(connection)
+
+    db = SessionLocal()
+    try:
+        rollups.rebuild_progress(db)
+        db.commit()
+        print("Агрегаты прогресса пересчитаны")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
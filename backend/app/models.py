@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -45,6 +45,12 @@ class Test(Base):
 
 class CompletedTest(Base):
     __tablename__ = "completed_tests"
+    __table_args__ = (
+        Index("uq_completed_tests_student_test", "student_id", "test_id", unique=True),
+        Index("ix_completed_tests_student_completed_at", "student_id", "completed_at", "id"),
+        # Гистограмма баллов теста и тройки (студент, тест, балл) для аналитики читаются из индекса
+        Index("ix_completed_tests_test_score_student", "test_id", "score", "student_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -62,4 +68,49 @@ class Group(Base):
     name = Column(String(100), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    users = relationship("User", back_populates="group")
\ No newline at end of file
+    users = relationship("User", back_populates="group")
+
+class StudentCourseProgress(Base):
+    """Агрегат результатов студента по курсу, пересчитываемый из completed_tests"""
+    __tablename__ = "student_course_progress"
+    __table_args__ = (
+        # Рейтинг курса: первые места и число студентов выше заданного балла читаются по индексу
+        Index("ix_student_course_progress_rank", "course_id", "score_sum", "student_id"),
+    )
+
+    student_id = Column(Integer, primary_key=True)
+    course_id = Column(Integer, primary_key=True, index=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_activity = Column(DateTime(timezone=True), nullable=True)
+
+class StudentGroupProgress(Base):
+    """Агрегат результатов студента по курсам одного преподавателя в группе, пересчитываемый из completed_tests"""
+    __tablename__ = "student_group_progress"
+    __table_args__ = (
+        # Рейтинг группы: первые места и число студентов выше заданного балла читаются по индексу
+        Index("ix_student_group_progress_rank", "group_id", "teacher_id", "score_sum", "student_id"),
+    )
+
+    group_id = Column(Integer, primary_key=True)
+    teacher_id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_activity = Column(DateTime(timezone=True), nullable=True)
+
+class TestProgress(Base):
+    """Агрегат результатов по тесту, пересчитываемый из completed_tests"""
+    __tablename__ = "test_progress"
+
+    test_id = Column(Integer, primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_activity = Column(DateTime(timezone=True), nullable=True)
+
+class EntityVersion(Base):
+    """Счётчик изменений сущности, из которого строятся ETag читающих эндпоинтов"""
+    __tablename__ = "entity_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,37 @@
+"""Курсорная (keyset) пагинация списков.
+
+Курсор - непрозрачная для клиента строка с ключом сортировки последней
+отданной строки; следующая страница начинается строго после него.
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(*values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types):
+    """Разобрать курсор в значения указанных типов; неверный курсор - ошибка 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Неверный курсор страницы")
+
+def make_page(rows, limit: int, key):
+    """Собрать страницу из limit + 1 выбранных строк; key даёт ключ сортировки строки"""
+    next_cursor = encode_cursor(*key(rows[limit - 1])) if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
@@ -0,0 +1,323 @@
+"""Агрегаты прогресса, поддерживаемые при записи результатов.
+
+student_course_progress хранит по паре (студент, курс), student_group_progress
+по студенту и курсам одного преподавателя в группе, а test_progress по тесту
+количество результатов, сумму баллов и время последней активности. Эндпоинты
+статистики и рейтингов читают их вместо пересчёта строк completed_tests.
+
+При сдаче теста агрегаты обновляются приращениями в той же транзакции, при
+удалении пользователей, курсов и тестов и при переносе курсов и тестов
+затронутые строки пересчитываются.
+Полный пересчёт для исправления расхождений, из каталога backend:
+
+    python -m app.rollups
+"""
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import List, Iterable
+
+from . import models
+from .models import CompletedTest, StudentCourseProgress, StudentGroupProgress, TestProgress
+
+
+def _add_progress(db: Session, model, rows: List[dict]):
+    """Прибавить приращения к строкам агрегата, создавая отсутствующие"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql_insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            completed_count=model.completed_count + stmt.inserted.completed_count,
+            score_sum=model.score_sum + stmt.inserted.score_sum,
+            last_activity=stmt.inserted.last_activity
+        )
+    elif dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert_(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in model.__table__.primary_key],
+            set_={
+                "completed_count": model.completed_count + stmt.excluded.completed_count,
+                "score_sum": model.score_sum + stmt.excluded.score_sum,
+                "last_activity": stmt.excluded.last_activity
+            }
+        )
+    else:
+        key_columns = [column.name for column in model.__table__.primary_key]
+        for row in rows:
+            progress = db.get(model, tuple(row[name] for name in key_columns))
+            if progress:
+                progress.completed_count += row["completed_count"]
+                progress.score_sum += row["score_sum"]
+                progress.last_activity = row["last_activity"]
+            else:
+                db.add(model(**row))
+        db.flush()
+        return
+
+    db.execute(stmt)
+
+def _lock_students(db: Session, student_ids: Iterable[int]):
+    """Заблокировать строки студентов до конца транзакции: их сдачи учитываются по очереди"""
+    student_ids = sorted(set(student_ids))
+
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite не поддерживает SELECT ... FOR UPDATE: блокировку записи берёт первый изменяющий запрос
+        db.execute(
+            update(models.User).where(models.User.id.in_(student_ids)).values(id=models.User.id),
+            execution_options={"synchronize_session": False}
+        )
+        return
+
+    db.query(models.User.id)\
+        .filter(models.User.id.in_(student_ids))\
+        .order_by(models.User.id)\
+        .with_for_update()\
+        .all()
+
+def record_results(db: Session, rows: List[dict]):
+    """Учесть результаты в агрегатах; вызывается до их записи в completed_tests.
+
+    Приращения считаются от прежних баллов, поэтому прежние баллы читаются под
+    блокировкой студента: одновременные сдачи того же студента ждут коммита.
+    """
+    pairs = [(row["student_id"], row["test_id"]) for row in rows]
+
+    _lock_students(db, (student_id for student_id, _ in pairs))
+    previous_scores = {
+        (student_id, test_id): score
+        for student_id, test_id, score in db.query(
+            CompletedTest.student_id, CompletedTest.test_id, CompletedTest.score
+        )\
+            .filter(tuple_(CompletedTest.student_id, CompletedTest.test_id).in_(pairs))\
+            .with_for_update()
+    }
+    test_courses = {
+        test_id: (course_id, group_id, teacher_id)
+        for test_id, course_id, group_id, teacher_id in db.query(
+            models.Test.id, models.Course.id, models.Course.group_id, models.Course.teacher_id
+        )\
+            .join(models.Course, models.Test.course_id == models.Course.id)\
+            .filter(models.Test.id.in_({test_id for _, test_id in pairs}))
+    }
+
+    student_course_deltas = {}
+    student_group_deltas = {}
+    test_deltas = {}
+    for row in rows:
+        pair = (row["student_id"], row["test_id"])
+        added = 0 if pair in previous_scores else 1
+        score_delta = row["score"] - previous_scores.get(pair, 0)
+
+        course_id, group_id, teacher_id = test_courses[row["test_id"]]
+
+        for deltas, key in (
+            (student_course_deltas, (row["student_id"], course_id)),
+            (student_group_deltas, (group_id, teacher_id, row["student_id"])),
+            (test_deltas, row["test_id"])
+        ):
+            count, score_sum = deltas.get(key, (0, 0))
+            deltas[key] = (count + added, score_sum + score_delta)
+
+    _add_progress(db, StudentCourseProgress, [
+        {
+            "student_id": student_id,
+            "course_id": course_id,
+            "completed_count": count,
+            "score_sum": score_sum,
+            "last_activity": func.now()
+        }
+        for (student_id, course_id), (count, score_sum) in student_course_deltas.items()
+    ])
+    _add_progress(db, StudentGroupProgress, [
+        {
+            "group_id": group_id,
+            "teacher_id": teacher_id,
+            "student_id": student_id,
+            "completed_count": count,
+            "score_sum": score_sum,
+            "last_activity": func.now()
+        }
+        for (group_id, teacher_id, student_id), (count, score_sum) in student_group_deltas.items()
+    ])
+    _add_progress(db, TestProgress, [
+        {
+            "test_id": test_id,
+            "completed_count": count,
+            "score_sum": score_sum,
+            "last_activity": func.now()
+        }
+        for test_id, (count, score_sum) in test_deltas.items()
+    ])
+
+def refresh_progress(
+    db: Session,
+    student_ids: Iterable[int] = (),
+    course_ids: Iterable[int] = (),
+    test_ids: Iterable[int] = (),
+    teacher_ids: Iterable[int] = ()
+):
+    """Пересчитать из completed_tests агрегаты указанных студентов, курсов, тестов и преподавателей.
+
+    Суммы по группам пересчитываются целиком для преподавателей указанных курсов:
+    курс мог перейти в другую группу или к другому преподавателю.
+    """
+    student_ids, course_ids, test_ids = list(student_ids), list(course_ids), list(test_ids)
+    teacher_ids = set(teacher_ids)
+    if course_ids:
+        teacher_ids.update(
+            teacher_id for (teacher_id,) in db.query(models.Course.teacher_id)\
+                .filter(models.Course.id.in_(course_ids))
+        )
+
+    if student_ids:
+        _rebuild_student_course_progress(
+            db,
+            StudentCourseProgress.student_id.in_(student_ids),
+            CompletedTest.student_id.in_(student_ids)
+        )
+        _rebuild_student_group_progress(
+            db,
+            StudentGroupProgress.student_id.in_(student_ids),
+            CompletedTest.student_id.in_(student_ids)
+        )
+
+    if course_ids:
+        _rebuild_student_course_progress(
+            db,
+            StudentCourseProgress.course_id.in_(course_ids),
+            models.Test.course_id.in_(course_ids)
+        )
+
+    if teacher_ids:
+        _rebuild_student_group_progress(
+            db,
+            StudentGroupProgress.teacher_id.in_(teacher_ids),
+            models.Course.teacher_id.in_(teacher_ids)
+        )
+
+    if test_ids:
+        _rebuild_test_progress(
+            db,
+            TestProgress.test_id.in_(test_ids),
+            CompletedTest.test_id.in_(test_ids)
+        )
+
+def rebuild_progress(db: Session):
+    """Полностью пересчитать все агрегаты из completed_tests"""
+    _rebuild_student_course_progress(db)
+    _rebuild_student_group_progress(db)
+    _rebuild_test_progress(db)
+
+def progress_scope_for_user(db: Session, user_id: int):
+    """Агрегаты, которые затрагивает удаление пользователя вместе с его результатами и курсами"""
+    course_ids = [
+        course_id for (course_id,) in db.query(models.Course.id)\
+            .filter(models.Course.teacher_id == user_id)
+    ]
+    test_ids = [
+        test_id for (test_id,) in db.query(CompletedTest.test_id)\
+            .filter(CompletedTest.student_id == user_id)
+    ]
+    test_ids += [
+        test_id for (test_id,) in db.query(models.Test.id)\
+            .filter(models.Test.course_id.in_(course_ids))
+    ]
+
+    return {"student_ids": [user_id], "course_ids": course_ids, "test_ids": test_ids, "teacher_ids": [user_id]}
+
+def progress_scope_for_course(db: Session, course_id: int):
+    """Агрегаты, которые затрагивает удаление курса вместе с его тестами"""
+    test_ids = [
+        test_id for (test_id,) in db.query(models.Test.id)\
+            .filter(models.Test.course_id == course_id)
+    ]
+    teacher_ids = [
+        teacher_id for (teacher_id,) in db.query(models.Course.teacher_id)\
+            .filter(models.Course.id == course_id)
+    ]
+
+    return {"course_ids": [course_id], "test_ids": test_ids, "teacher_ids": teacher_ids}
+
+def _rebuild_student_course_progress(db: Session, stale_filter=None, results_filter=None):
+    stale = delete(StudentCourseProgress)
+    aggregate = select(
+        CompletedTest.student_id,
+        models.Test.course_id,
+        func.count(CompletedTest.id),
+        func.sum(CompletedTest.score),
+        func.max(CompletedTest.completed_at)
+    )\
+        .join(models.Test, CompletedTest.test_id == models.Test.id)\
+        .group_by(CompletedTest.student_id, models.Test.course_id)
+
+    if stale_filter is not None:
+        stale = stale.where(stale_filter)
+        aggregate = aggregate.where(results_filter)
+
+    db.execute(stale)
+    db.execute(insert(StudentCourseProgress).from_select(
+        ["student_id", "course_id", "completed_count", "score_sum", "last_activity"],
+        aggregate
+    ))
+
+def _rebuild_student_group_progress(db: Session, stale_filter=None, results_filter=None):
+    stale = delete(StudentGroupProgress)
+    aggregate = select(
+        models.Course.group_id,
+        models.Course.teacher_id,
+        CompletedTest.student_id,
+        func.count(CompletedTest.id),
+        func.sum(CompletedTest.score),
+        func.max(CompletedTest.completed_at)
+    )\
+        .join(models.Test, CompletedTest.test_id == models.Test.id)\
+        .join(models.Course, models.Test.course_id == models.Course.id)\
+        .group_by(models.Course.group_id, models.Course.teacher_id, CompletedTest.student_id)
+
+    if stale_filter is not None:
+        stale = stale.where(stale_filter)
+        aggregate = aggregate.where(results_filter)
+
+    db.execute(stale)
+    db.execute(insert(StudentGroupProgress).from_select(
+        ["group_id", "teacher_id", "student_id", "completed_count", "score_sum", "last_activity"],
+        aggregate
+    ))
+
+def _rebuild_test_progress(db: Session, stale_filter=None, results_filter=None):
+    stale = delete(TestProgress)
+    aggregate = select(
+        CompletedTest.test_id,
+        func.count(CompletedTest.id),
+        func.sum(CompletedTest.score),
+        func.max(CompletedTest.completed_at)
+    )\
+        .group_by(CompletedTest.test_id)
+
+    if stale_filter is not None:
+        stale = stale.where(stale_filter)
+        aggregate = aggregate.where(results_filter)
+
+    db.execute(stale)
+    db.execute(insert(TestProgress).from_select(
+        ["test_id", "completed_count", "score_sum", "last_activity"],
+        aggregate
+    ))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        rebuild_progress(db)
+        db.commit()
+        print("Агрегаты прогресса пересчитаны")
+    finally:
+        db.close()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class UserLogin(BaseModel):
@@ -39,6 +39,25 @@ class UserProfile(BaseModel):
     class Config:
         from_attributes = True
 
+class UserCreate(BaseModel):
+    login: str
+    email: EmailStr
+    fio: str
+    password: str
+    role: Literal["student", "teacher", "admin"]
+    group_id: Optional[int] = None
+
+class UserImportRow(BaseModel):
+    row: int
+    login: Optional[str] = None
+    status: str
+    detail: Optional[str] = None
+
+class UserImportReport(BaseModel):
+    created: int
+    failed: int
+    rows: List[UserImportRow]
+
 class CourseBase(BaseModel):
     name: str
 
@@ -77,6 +96,17 @@ class CompletedTestBase(BaseModel):
 class CompletedTestCreate(CompletedTestBase):
     test_id: int
 
+class CompletedTestBatchItem(BaseModel):
+    index: int
+    test_id: int
+    status: str
+    detail: Optional[str] = None
+
+class CompletedTestBatchReport(BaseModel):
+    saved: int
+    failed: int
+    items: List[CompletedTestBatchItem]
+
 class CompletedTest(CompletedTestBase):
     id: int
     student_id: int
@@ -122,11 +152,57 @@ class TeacherStats(BaseModel):
     group_count: int 
     student_count: int
 
+class CourseAnalytics(BaseModel):
+    course_id: int
+    course_name: str
+    group_name: str
+    student_count: int
+    test_count: int
+    completed_count: int
+    completion_rate: float
+    average_score: float
+
+class TestAnalytics(BaseModel):
+    test_id: int
+    test_name: str
+    course_id: int
+    completed_count: int
+    completion_rate: float
+    average_score: float
+
+class StudentAnalytics(BaseModel):
+    student_id: int
+    student_name: str
+    student_login: str
+    group_id: int
+    completed_tests: int
+    total_tests: int
+    completion_rate: float
+    average_score: float
+
+class TeacherAnalytics(BaseModel):
+    course_count: int
+    test_count: int
+    student_count: int
+    result_count: int
+    average_score: float
+    completion_rate: float
+    courses: List[CourseAnalytics]
+    tests: List[TestAnalytics]
+    students: List[StudentAnalytics]
+
 class AdminStats(BaseModel):
     course_count: int
     user_count: int
     group_count: int
 
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
 class TestWithCompletion(BaseModel):
     id: int
     name: str
@@ -180,6 +256,42 @@ class CourseStatistics(BaseModel):
     average_score: float
     student_progress: List[StudentProgress]
         
+class LeaderboardEntry(BaseModel):
+    rank: int
+    student_id: int
+    student_name: str
+    student_login: str
+    completed_tests: int
+    total_score: int
+    average_score: float
+
+class Leaderboard(BaseModel):
+    total_students: int
+    entries: List[LeaderboardEntry]
+    student: Optional[LeaderboardEntry] = None
+
+class ScoreBucket(BaseModel):
+    score: int
+    count: int
+
+class ScoreDistribution(BaseModel):
+    total: int
+    average_score: float
+    buckets: List[ScoreBucket]
+    p25: Optional[int] = None
+    p50: Optional[int] = None
+    p75: Optional[int] = None
+    p90: Optional[int] = None
+
+class TestScoreDistribution(ScoreDistribution):
+    test_id: int
+    test_name: str
+
+class CourseScoreDistribution(ScoreDistribution):
+    course_id: int
+    course_name: str
+    tests: List[TestScoreDistribution]
+
 class TestWithStatistics(BaseModel):
     id: int
     name: str
@@ -211,4 +323,28 @@ class TestWithCourseAndGroup(BaseModel):
     course: CourseWithDetails
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserPage(BaseModel):
+    items: List[UserProfile]
+    next_cursor: Optional[str] = None
+
+class TestPage(BaseModel):
+    items: List[TestWithCourseAndGroup]
+    next_cursor: Optional[str] = None
+
+class CoursePage(BaseModel):
+    items: List[CourseWithDetails]
+    next_cursor: Optional[str] = None
+
+class StudentTestDetailPage(BaseModel):
+    items: List[StudentTestDetail]
+    next_cursor: Optional[str] = None
+
+class Dashboard(BaseModel):
+    profile: UserProfile
+    courses: List[CourseWithDetails]
+    student_stats: Optional[StudentStats] = None
+    completed_tests: Optional[StudentTestDetailPage] = None
+    teacher_stats: Optional[TeacherStats] = None
+    admin_stats: Optional[AdminStats] = None
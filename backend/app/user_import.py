@@ -0,0 +1,182 @@
+"""Потоковый массовый импорт пользователей из CSV или NDJSON.
+
+Тело запроса читается по строкам, строки копятся в пачки по IMPORT_BATCH_SIZE.
+Для каждой пачки уникальность логинов и email и существование групп проверяются
+одним запросом, пароли хешируются параллельно в пуле процессов, а пользователи
+вставляются одним INSERT. Если базе мешают пользователи, созданные параллельно с
+импортом, пачка вставляется по одной строке и отклоняются только конфликтующие.
+"""
+import codecs
+import csv
+import json
+import os
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .auth import hash_passwords
+from .versions import bump_versions
+from .schemas import UserCreate
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+
+async def iter_lines(request: Request):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def iter_rows(request: Request, data_format: str):
+    """Выдавать (номер строки, данные, ошибка разбора) для каждой непустой строки данных"""
+    header = None
+    row_number = 0
+
+    async for line in iter_lines(request):
+        if not line.strip():
+            continue
+
+        if data_format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            yield row_number, {name: value for name, value in zip(header, values) if value != ""}, None
+        else:
+            row_number += 1
+            try:
+                yield row_number, json.loads(line), None
+            except ValueError:
+                yield row_number, None, "Неверный JSON"
+
+def find_conflicts(db: Session, logins, emails, group_ids):
+    """Уже занятые логины и email и существующие группы одним запросом на каждое"""
+    existing = db.query(models.User.login, models.User.email)\
+        .filter(or_(models.User.login.in_(logins), models.User.email.in_(emails)))\
+        .all()
+    known_groups = {
+        group_id for (group_id,) in db.query(models.Group.id)
+            .filter(models.Group.id.in_(group_ids))
+    }
+
+    return {login for login, _ in existing}, {email for _, email in existing}, known_groups
+
+def insert_users(db: Session, users):
+    """Вставить пачку; для каждого пользователя вернуть, вставлен ли он"""
+    try:
+        db.execute(insert(models.User), users)
+        bump_versions(db, "users")
+        db.commit()
+        return [True] * len(users)
+    except IntegrityError:
+        db.rollback()
+
+    inserted = []
+    for user in users:
+        try:
+            db.execute(insert(models.User), [user])
+            bump_versions(db, "users")
+            db.commit()
+            inserted.append(True)
+        except IntegrityError:
+            db.rollback()
+            inserted.append(False)
+    return inserted
+
+async def import_batch(db: Session, batch, report):
+    """Проверить, захешировать и вставить пачку строк, дописав результат в отчёт"""
+    candidates = []
+    for row_number, data, error in batch:
+        if error is None:
+            try:
+                candidates.append((row_number, UserCreate.model_validate(data)))
+                continue
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in e.errors()
+                )
+        login = data.get("login") if isinstance(data, dict) else None
+        report.append({"row": row_number, "login": login, "status": "error", "detail": error})
+
+    if not candidates:
+        return
+
+    taken_logins, taken_emails, known_groups = await run_in_threadpool(
+        find_conflicts,
+        db,
+        {user.login for _, user in candidates},
+        {user.email for _, user in candidates},
+        {user.group_id for _, user in candidates if user.group_id is not None}
+    )
+
+    accepted = []
+    for row_number, user in candidates:
+        if user.login in taken_logins or user.email in taken_emails:
+            detail = "Пользователь с таким логином или email уже существует"
+        elif user.group_id is not None and user.group_id not in known_groups:
+            detail = "Группа не найдена"
+        else:
+            taken_logins.add(user.login)
+            taken_emails.add(user.email)
+            accepted.append((row_number, user))
+            continue
+        report.append({"row": row_number, "login": user.login, "status": "error", "detail": detail})
+
+    if not accepted:
+        return
+
+    password_hashes = await hash_passwords([user.password for _, user in accepted])
+    inserted = await run_in_threadpool(insert_users, db, [
+        {
+            "login": user.login,
+            "email": user.email,
+            "fio": user.fio,
+            "password_hash": password_hash,
+            "role": user.role,
+            "group_id": user.group_id
+        }
+        for (_, user), password_hash in zip(accepted, password_hashes)
+    ])
+
+    for (row_number, user), created in zip(accepted, inserted):
+        if created:
+            report.append({"row": row_number, "login": user.login, "status": "created"})
+        else:
+            # Логин или email занял пользователь, созданный параллельно с импортом
+            report.append({
+                "row": row_number,
+                "login": user.login,
+                "status": "error",
+                "detail": "Пользователь с таким логином или email уже существует"
+            })
+
+async def import_users(request: Request, db: Session, data_format: str):
+    report = []
+    batch = []
+
+    async for row in iter_rows(request, data_format):
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await import_batch(db, batch, report)
+            batch = []
+
+    if batch:
+        await import_batch(db, batch, report)
+
+    report.sort(key=lambda item: item["row"])
+    created = sum(1 for item in report if item["status"] == "created")
+    return {"created": created, "failed": len(report) - created, "rows": report}
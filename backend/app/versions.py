@@ -0,0 +1,92 @@
+"""Счётчики версий сущностей для ETag и условных GET-запросов.
+
+Изменяющие эндпоинты увеличивают версии затронутых сущностей в той же
+транзакции, что и сами изменения. Читающий эндпоинт строит ETag из версий
+сущностей, от которых зависит его ответ, и отвечает 304 ещё до основных запросов.
+
+Результаты, кроме общего счётчика results, имеют счётчик каждого курса
+(COURSE_RESULTS): эндпоинты одного курса зависят только от него, и сдача теста
+не сбрасывает кеш остальных курсов. Эндпоинты по нескольким курсам зависят от
+общего счётчика, поэтому каждая сдача обновляет его строку и на MySQL сдачи
+проходят это обновление по очереди. Счётчики обновляются последним запросом
+перед коммитом, так что блокировка строки держится недолго.
+"""
+import hashlib
+
+from fastapi import Request
+from sqlalchemy import insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+ENTITIES = ("groups", "users", "courses", "tests", "results")
+
+# Счётчик результатов одного курса; {course_id} подставляется из пути запроса
+COURSE_RESULTS = "results:course:{course_id}"
+
+
+def ensure_versions(connection):
+    """Создать недостающие строки счётчиков"""
+    table = models.EntityVersion.__table__
+    existing = {name for (name,) in connection.execute(table.select().with_only_columns(table.c.name))}
+    missing = [{"name": name, "version": 0} for name in ENTITIES if name not in existing]
+    if missing:
+        connection.execute(insert(table), missing)
+
+def course_results(course_id: int):
+    return COURSE_RESULTS.format(course_id=course_id)
+
+def bump_versions(db: Session, *entities):
+    """Увеличить версии сущностей; отсутствующие счётчики (результаты курса) создаются"""
+    # Строки обновляются в одном порядке, чтобы одновременные транзакции не блокировали друг друга навстречу
+    names = sorted(set(entities))
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql_insert(models.EntityVersion).values([{"name": name, "version": 1} for name in names])
+        stmt = stmt.on_duplicate_key_update(version=models.EntityVersion.version + 1)
+    elif dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert_(models.EntityVersion).values([{"name": name, "version": 1} for name in names])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.EntityVersion.name],
+            set_={"version": models.EntityVersion.version + 1}
+        )
+    else:
+        for name in names:
+            entity_version = db.get(models.EntityVersion, name)
+            if entity_version:
+                entity_version.version += 1
+            else:
+                db.add(models.EntityVersion(name=name, version=1))
+        db.flush()
+        return
+
+    db.execute(stmt)
+
+def load_versions(db: Session, entities):
+    return dict(
+        db.query(models.EntityVersion.name, models.EntityVersion.version)
+            .filter(models.EntityVersion.name.in_(entities))
+            .all()
+    )
+
+def make_etag(request: Request, user_id: int, versions):
+    """ETag ответа конкретного пользователя на конкретный URL при данных версиях"""
+    key = "|".join([
+        request.url.path,
+        request.url.query,
+        str(user_id),
+        *(f"{name}:{versions.get(name, 0)}" for name in sorted(versions))
+    ])
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
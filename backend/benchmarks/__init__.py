@@ -0,0 +1,5 @@
+"""Скрипты генерации данных, нагрузочного тестирования и проверок производительности"""
+from pathlib import Path
+
+# База по умолчанию для seed и load, если DATABASE_URL не задан
+BENCHMARK_DATABASE_URL = f"sqlite:///{Path(__file__).resolve().parent / 'benchmark.db'}"
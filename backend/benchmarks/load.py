@@ -0,0 +1,244 @@
+"""Нагрузочный тест: виртуальные студенты, преподаватели и администраторы
+проходят типичные сценарии работы с API, а по каждому маршруту считаются
+p50/p95/p99 времени ответа и пропускная способность.
+
+Приложение запускается в том же процессе (ASGI) или тестируется по сети через
+--base-url. Данные готовит benchmarks.seed. Запуск из каталога backend:
+
+    python -m benchmarks.load --users 50 --duration 60
+    python -m benchmarks.load --users 50 --duration 60 --compare benchmarks/results/<прошлый>.json
+
+Результаты сохраняются в benchmarks/results/ для сравнения между запусками.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from . import BENCHMARK_DATABASE_URL
+
+os.environ.setdefault("DATABASE_URL", BENCHMARK_DATABASE_URL)
+
+import httpx
+
+from .seed import DEFAULT_PASSWORD
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_MIX = "student=0.8,teacher=0.15,admin=0.05"
+
+
+def percentile(sorted_values, fraction: float):
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route: str, seconds: float, status_code: int):
+        self.latencies[route].append(seconds)
+        if status_code >= 400:
+            self.errors[route] += 1
+
+    def summary(self, elapsed: float):
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors[route],
+                "rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(statistics.fmean(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+
+        everything = sorted(value for values in self.latencies.values() for value in values)
+        total = {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(everything) / elapsed, 2),
+            "p50_ms": round(percentile(everything, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(everything, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(everything, 0.99) * 1000, 2),
+        }
+        return routes, total
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, login: str, password: str, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.login_name = login
+        self.password = password
+        self.rng = rng
+        self.headers = {}
+
+    async def request(self, method: str, route: str, params=None, json_body=None, **path_params):
+        """Запрос по шаблону маршрута; время пишется под шаблоном, а не под конкретным путём"""
+        started = time.perf_counter()
+        response = await self.client.request(
+            method, route.format(**path_params), params=params, json=json_body, headers=self.headers
+        )
+        self.recorder.record(f"{method} {route}", time.perf_counter() - started, response.status_code)
+        return response
+
+    async def login(self):
+        response = await self.request("POST", "/auth/login", json_body={"login": self.login_name, "password": self.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def sample(self, items, count: int):
+        return self.rng.sample(items, min(count, len(items)))
+
+async def student_journey(user: VirtualUser):
+    dashboard = (await user.request("GET", "/api/dashboard")).json()
+
+    for course in user.sample(dashboard["courses"], 2):
+        tests = (await user.request(
+            "GET", "/api/courses/{course_id}/tests-with-completion", course_id=course["id"]
+        )).json()
+        for test in user.sample(tests, 1):
+            await user.request("POST", "/api/completed-tests", json_body={"test_id": test["id"], "score": user.rng.randint(0, 10)})
+
+    page = (await user.request("GET", "/api/student/completed-tests")).json()
+    if page["next_cursor"]:
+        await user.request("GET", "/api/student/completed-tests", params={"cursor": page["next_cursor"]})
+
+async def teacher_journey(user: VirtualUser):
+    dashboard = (await user.request("GET", "/api/dashboard")).json()
+
+    for course in user.sample(dashboard["courses"], 2):
+        await user.request("GET", "/api/teacher/courses/{course_id}/statistics", course_id=course["id"])
+        await user.request("GET", "/api/teacher/courses/{course_id}/tests", course_id=course["id"])
+        await user.request("GET", "/api/teacher/courses/{course_id}/leaderboard", course_id=course["id"])
+
+async def admin_journey(user: VirtualUser):
+    await user.request("GET", "/api/dashboard")
+
+    page = (await user.request("GET", "/api/admin/users")).json()
+    if page["next_cursor"]:
+        await user.request("GET", "/api/admin/users", params={"cursor": page["next_cursor"]})
+
+    await user.request("GET", "/api/admin/tests")
+    await user.request("GET", "/api/admin/courses")
+    await user.request("GET", "/api/groups")
+
+JOURNEYS = {
+    "student": student_journey,
+    "teacher": teacher_journey,
+    "admin": admin_journey,
+}
+
+async def discover_logins(client: httpx.AsyncClient, password: str):
+    """Логины студентов и преподавателей берутся из API администратора"""
+    response = await client.post("/auth/login", json={"login": "admin", "password": password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    logins = {"admin": ["admin"]}
+    for role in ("student", "teacher"):
+        page = (await client.get("/api/admin/users", params={"role": role, "limit": 500}, headers=headers)).json()
+        logins[role] = [user["login"] for user in page["items"]]
+    return logins
+
+async def run_user(user: VirtualUser, journey, deadline: float, think_time: float):
+    await user.login()
+    while time.perf_counter() < deadline:
+        await journey(user)
+        if think_time:
+            await asyncio.sleep(user.rng.uniform(0, 2 * think_time))
+
+async def run(args):
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+
+    mix = {role: float(share) for role, share in (part.split("=") for part in args.mix.split(","))}
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+
+    async with client:
+        logins = await discover_logins(client, args.password)
+        roles = rng.choices(list(mix), weights=list(mix.values()), k=args.users)
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            run_user(
+                VirtualUser(client, recorder, rng.choice(logins[role]), args.password, random.Random(rng.random())),
+                JOURNEYS[role],
+                deadline,
+                args.think_time
+            )
+            for role in roles
+        ))
+        elapsed = time.perf_counter() - started
+
+    routes, total = recorder.summary(elapsed)
+    return {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "users": args.users,
+            "duration": args.duration,
+            "mix": mix,
+            "think_time": args.think_time,
+            "target": args.base_url or "in-process",
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "total": total,
+        "routes": routes,
+    }
+
+def print_report(report, previous=None):
+    previous_routes = previous["routes"] if previous else {}
+    header = f"{'маршрут':<58} {'запр.':>6} {'ошиб.':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header + ("  Δp95" if previous else ""))
+
+    rows = [*report["routes"].items(), ("ВСЕГО", report["total"])]
+    for route, stats in rows:
+        line = (
+            f"{route:<58} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>7.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+        before = previous["total"] if previous and route == "ВСЕГО" else previous_routes.get(route)
+        if before and before["p95_ms"]:
+            line += f"  {(stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100:+.0f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="число одновременных виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30, help="длительность, с")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="доли ролей среди пользователей")
+    parser.add_argument("--think-time", type=float, default=0.0, help="средняя пауза между сценариями, с")
+    parser.add_argument("--base-url", help="адрес запущенного сервера вместо приложения в процессе")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/load-<время>.json)")
+    parser.add_argument("--compare", help="файл прошлого запуска для сравнения")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    previous = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    print_report(report, previous)
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты сохранены в {output}")
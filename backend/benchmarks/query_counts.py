@@ -0,0 +1,187 @@
+"""Проверка, что число запросов к БД у эндпоинтов не растёт вместе с данными (N+1).
+
+Скрипт заполняет базу маленьким набором данных, считает запросы каждого
+эндпоинта, затем многократно увеличивает группы, курсы, тесты и результаты и
+считает снова. Число запросов должно совпасть и не превышать бюджет,
+объявленный у маршрута зависимостью query_budget. Запуск из каталога backend
+(без DATABASE_URL используется временная SQLite):
+
+    python -m benchmarks.query_counts
+
+Код выхода 1, если хотя бы один эндпоинт не прошёл проверку. Та же проверка
+выполняется в тестах (tests/test_query_counts.py).
+"""
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/query_counts.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from starlette.routing import Match
+
+from app import main, models, rollups
+from app.auth import create_access_token, principal_cache
+from app.database import SessionLocal, engine
+from app.metrics import QueryCounter
+
+# Роль, логин которой делает запрос, и путь; {course}, {group} и {test} заменяются id проверочного курса, группы и теста
+ENDPOINTS = (
+    ("student", "/auth/me"),
+    ("student", "/api/dashboard"),
+    ("student", "/api/courses/my"),
+    ("student", "/api/student/stats"),
+    ("student", "/api/student/completed-tests"),
+    ("student", "/api/courses/{course}/tests"),
+    ("student", "/api/courses/{course}/tests-with-completion"),
+    ("teacher", "/api/dashboard"),
+    ("teacher", "/api/courses/my"),
+    ("teacher", "/api/teacher/stats"),
+    ("teacher", "/api/teacher/analytics"),
+    ("teacher", "/api/teacher/courses/{course}/statistics"),
+    ("teacher", "/api/teacher/courses/{course}/tests"),
+    ("teacher", "/api/teacher/courses/{course}/leaderboard?student_id={student}"),
+    ("teacher", "/api/teacher/groups/{group}/leaderboard?student_id={student}"),
+    ("teacher", "/api/teacher/courses/{course}/score-distribution"),
+    ("teacher", "/api/teacher/tests/{test}/score-distribution"),
+    ("admin", "/api/dashboard"),
+    ("admin", "/api/admin/stats"),
+    ("admin", "/api/admin/users"),
+    ("admin", "/api/admin/tests"),
+    ("admin", "/api/admin/courses"),
+    ("admin", "/api/groups"),
+    ("admin", "/api/admin/groups"),
+)
+
+
+def create_user(db, login: str, role: str, group_id=None):
+    user = models.User(
+        login=login,
+        email=f"{login}@example.com",
+        fio=login,
+        password_hash="-",
+        role=role,
+        group_id=group_id
+    )
+    db.add(user)
+    db.flush()
+    return user.id
+
+def grow(db, teacher_id: int, group_id: int, course_id: int, students: int, tests: int, courses: int):
+    """Добавить студентов в группу, тесты в курс и новые курсы, и результаты всех студентов"""
+    offset = db.query(models.User).count()
+    student_ids = [
+        create_user(db, f"student_{offset + index}", "student", group_id)
+        for index in range(students)
+    ]
+    for index in range(courses):
+        db.add(models.Course(name=f"Курс {offset + index}", teacher_id=teacher_id, group_id=group_id))
+    db.execute(insert(models.Test), [{"name": f"Тест {offset + index}", "course_id": course_id} for index in range(tests)])
+    db.flush()
+
+    test_ids = [test_id for (test_id,) in db.query(models.Test.id).filter(models.Test.course_id == course_id)]
+    all_students = [
+        student_id for (student_id,) in db.query(models.User.id)
+            .filter(models.User.group_id == group_id, models.User.role == "student")
+    ]
+    done = {
+        (student_id, test_id) for student_id, test_id in db.query(
+            models.CompletedTest.student_id, models.CompletedTest.test_id
+        )
+    }
+    results = [
+        {"student_id": student_id, "test_id": test_id, "score": (student_id + test_id) % 11}
+        for student_id in all_students for test_id in test_ids
+        if (student_id, test_id) not in done and (student_id + test_id) % 3
+    ]
+    if results:
+        db.execute(insert(models.CompletedTest), results)
+
+    rollups.rebuild_progress(db)
+    db.commit()
+    return student_ids
+
+def route_budget(path: str):
+    scope = {"type": "http", "path": path, "method": "GET"}
+    for route in main.app.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            for dependency in getattr(route, "dependencies", []):
+                budget = getattr(dependency.dependency, "query_budget", None)
+                if budget is not None:
+                    return budget
+    return None
+
+def measure(client: TestClient, logins, ids):
+    counts = {}
+    for role, template in ENDPOINTS:
+        path = template.format(**ids)
+        # Холодные кеши: считается худший случай
+        principal_cache.clear()
+        main.result_cache.backend.clear()
+
+        headers = {"Authorization": f"Bearer {create_access_token(data={'login': logins[role]})}"}
+        with QueryCounter(engine) as counter:
+            response = client.get(path, headers=headers)
+        response.raise_for_status()
+        counts[(role, template)] = counter.count
+    return counts
+
+def check():
+    """Число запросов каждого эндпоинта на малых и больших данных, его бюджет и найденные проблемы"""
+    db = SessionLocal()
+    try:
+        group = models.Group(name="Проверочная группа")
+        db.add(group)
+        db.flush()
+        teacher_id = create_user(db, "probe_teacher", "teacher")
+        create_user(db, "probe_admin", "admin")
+        course = models.Course(name="Проверочный курс", teacher_id=teacher_id, group_id=group.id)
+        db.add(course)
+        db.flush()
+        group_id, course_id = group.id, course.id
+
+        probe_student = grow(db, teacher_id, group_id, course_id, students=5, tests=3, courses=1)[0]
+        logins = {
+            "student": db.get(models.User, probe_student).login,
+            "teacher": "probe_teacher",
+            "admin": "probe_admin",
+        }
+
+        test_id = db.query(models.Test.id).filter(models.Test.course_id == course_id).first()[0]
+        ids = {"course": course_id, "group": group_id, "student": probe_student, "test": test_id}
+
+        client = TestClient(main.app)
+        small = measure(client, logins, ids)
+        grow(db, teacher_id, group_id, course_id, students=45, tests=27, courses=9)
+        large = measure(client, logins, ids)
+    finally:
+        db.close()
+
+    report = []
+    for role, template in ENDPOINTS:
+        before, after = small[(role, template)], large[(role, template)]
+        budget = route_budget(template.format(**ids).split("?")[0])
+        problems = []
+        if after != before:
+            problems.append("растёт с данными")
+        if budget is None:
+            problems.append("нет бюджета")
+        elif after > budget:
+            problems.append("сверх бюджета")
+        report.append((role, template, before, after, budget, problems))
+
+    return report
+
+def run():
+    report = check()
+
+    print(f"{'роль':<8} {'эндпоинт':<72} {'мало':>5} {'много':>6} {'бюджет':>7}")
+    for role, template, before, after, budget, problems in report:
+        print(f"{role:<8} {template:<72} {before:>5} {after:>6} {budget if budget is not None else '-':>7}  {', '.join(problems)}")
+
+    return 1 if any(problems for *_, problems in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
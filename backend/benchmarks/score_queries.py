@@ -0,0 +1,96 @@
+"""Время распределений баллов, рейтингов и аналитики преподавателя на большом
+числе результатов одного преподавателя.
+
+Данные готовит benchmarks.seed: все курсы у одного преподавателя, по курсу на
+группу, каждый студент сдаёт все тесты своего курса. Каждый эндпоинт
+вызывается с пустым кешем результатов; для рейтингов место запрашивается у
+студента с наименьшим баллом (худший случай подсчёта студентов выше). Запуск из
+каталога backend (без DATABASE_URL используется временная SQLite):
+
+    python -m benchmarks.score_queries --results 100000 --repeat 10
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/score_queries.db")
+
+from fastapi.testclient import TestClient
+
+from app import main, models
+from app.auth import create_access_token
+from app.database import SessionLocal
+from .seed import generate
+
+GROUPS = 20
+TESTS_PER_COURSE = 50
+
+
+def seed(results: int):
+    """Один преподаватель (id 2), курс c у группы c; студентов столько, чтобы каждый сдал все тесты курса"""
+    db = SessionLocal()
+    try:
+        generate(
+            db,
+            groups=GROUPS,
+            students=max(results // TESTS_PER_COURSE, GROUPS),
+            teachers=1,
+            courses=GROUPS,
+            tests_per_course=TESTS_PER_COURSE,
+            results=results,
+            log=lambda message: None
+        )
+
+        result_count = db.query(models.CompletedTest).count()
+        course = db.query(models.Course).order_by(models.Course.id).first()
+        test_id = db.query(models.Test.id).filter(models.Test.course_id == course.id).order_by(models.Test.id).first()[0]
+        # Последнее место в курсе: место считается по всем студентам выше
+        last_student_id = db.query(models.StudentCourseProgress.student_id)\
+            .filter(models.StudentCourseProgress.course_id == course.id)\
+            .order_by(models.StudentCourseProgress.score_sum, models.StudentCourseProgress.student_id)\
+            .first()[0]
+        return result_count, {"course": course.id, "group": course.group_id, "test": test_id, "student": last_student_id}
+    finally:
+        db.close()
+
+def measure(client: TestClient, headers, path: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        main.result_cache.backend.clear()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return timings
+
+def run(results: int, repeat: int):
+    result_count, ids = seed(results)
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'login': 'teacher_0'})}"}
+
+    endpoints = (
+        f"/api/teacher/tests/{ids['test']}/score-distribution",
+        f"/api/teacher/courses/{ids['course']}/score-distribution",
+        f"/api/teacher/courses/{ids['course']}/leaderboard?student_id={ids['student']}",
+        f"/api/teacher/groups/{ids['group']}/leaderboard?student_id={ids['student']}",
+        "/api/teacher/analytics",
+    )
+
+    print(f"Результатов: {result_count}, повторов: {repeat}, кеш результатов пуст")
+    print(f"{'эндпоинт':<64} {'медиана, мс':>12} {'p95, мс':>9} {'макс, мс':>9}")
+    for path in endpoints:
+        # Прогрев: кеш пользователя и подготовленные запросы
+        measure(client, headers, path, 1)
+        timings = sorted(measure(client, headers, path, repeat))
+        p95 = timings[max(0, -(-len(timings) * 95 // 100) - 1)]
+        print(f"{path:<64} {statistics.median(timings):>12.1f} {p95:>9.1f} {timings[-1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.results, args.repeat)
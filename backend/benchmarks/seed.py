@@ -0,0 +1,192 @@
+"""Генератор синтетических данных для нагрузочного тестирования.
+
+Создаёт группы, преподавателей, студентов, курсы, тесты и результаты пачками
+через INSERT по моделям из models.py, затем пересчитывает агрегаты прогресса.
+Работает с SQLite и MySQL (DATABASE_URL; по умолчанию benchmarks/benchmark.db).
+Запуск из каталога backend, например для полного объёма:
+
+    python -m benchmarks.seed --reset --groups 500 --students 50000 \\
+        --teachers 1000 --courses 5000 --tests-per-course 10 --results 5000000
+
+Логины: admin, teacher_<n>, student_<n>; пароль у всех один (--password).
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from . import BENCHMARK_DATABASE_URL
+
+os.environ.setdefault("DATABASE_URL", BENCHMARK_DATABASE_URL)
+
+from sqlalchemy import insert
+
+from app import models, rollups
+from app.auth import get_password_hash
+from app.database import SessionLocal, engine
+from app.versions import ensure_versions
+
+DEFAULT_PASSWORD = "benchmark"
+
+
+def batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_rows(db, model, rows, batch_size: int):
+    count = 0
+    for batch in batches(rows, batch_size):
+        db.execute(insert(model), batch)
+        db.commit()
+        count += len(batch)
+    return count
+
+def generate(
+    db,
+    groups: int,
+    students: int,
+    teachers: int,
+    courses: int,
+    tests_per_course: int,
+    results: int,
+    password: str = DEFAULT_PASSWORD,
+    seed: int = 0,
+    batch_size: int = 10000,
+    log=print
+):
+    """Заполнить пустую базу; id назначаются явно, начиная с 1"""
+    if db.query(models.User.id).first() is not None:
+        raise SystemExit("База не пуста: используйте --reset")
+
+    rng = random.Random(seed)
+    password_hash = get_password_hash(password)
+    now = datetime.datetime.now()
+    started = time.perf_counter()
+
+    def report(name, count):
+        log(f"{name}: {count} ({time.perf_counter() - started:.1f} с)")
+
+    report("группы", insert_rows(db, models.Group, (
+        {"id": group_id, "name": f"Группа {group_id}"}
+        for group_id in range(1, groups + 1)
+    ), batch_size))
+
+    # id 1 - администратор, затем преподаватели, затем студенты
+    first_student_id = teachers + 2
+    users = [{
+        "id": 1, "login": "admin", "email": "admin@example.com", "fio": "Администратор",
+        "password_hash": password_hash, "role": "admin", "group_id": None
+    }]
+    users.extend(
+        {
+            "id": index + 2,
+            "login": f"teacher_{index}",
+            "email": f"teacher_{index}@example.com",
+            "fio": f"Преподаватель {index}",
+            "password_hash": password_hash,
+            "role": "teacher",
+            "group_id": None
+        }
+        for index in range(teachers)
+    )
+    report("пользователи", insert_rows(db, models.User, (
+        *users,
+        *(
+            {
+                "id": first_student_id + index,
+                "login": f"student_{index}",
+                "email": f"student_{index}@example.com",
+                "fio": f"Студент {index}",
+                "password_hash": password_hash,
+                "role": "student",
+                "group_id": index % groups + 1
+            }
+            for index in range(students)
+        )
+    ), batch_size))
+
+    # Курс c принадлежит группе c % groups и преподавателю c % teachers
+    report("курсы", insert_rows(db, models.Course, (
+        {
+            "id": course_id,
+            "name": f"Курс {course_id}",
+            "teacher_id": course_id % teachers + 2,
+            "group_id": course_id % groups + 1
+        }
+        for course_id in range(1, courses + 1)
+    ), batch_size))
+
+    tests_by_group = {group_id: [] for group_id in range(1, groups + 1)}
+    test_rows = []
+    for course_id in range(1, courses + 1):
+        for index in range(tests_per_course):
+            test_id = (course_id - 1) * tests_per_course + index + 1
+            test_rows.append({"id": test_id, "name": f"Тест {index + 1} курса {course_id}", "course_id": course_id})
+            tests_by_group[course_id % groups + 1].append(test_id)
+    report("тесты", insert_rows(db, models.Test, test_rows, batch_size))
+
+    per_student = results / students if students else 0
+
+    def result_rows():
+        for index in range(students):
+            group_tests = tests_by_group[index % groups + 1]
+            # Дробная часть среднего распределяется случайно, чтобы сумма была близка к --results
+            count = min(len(group_tests), int(per_student) + (rng.random() < per_student % 1))
+            for test_id in rng.sample(group_tests, count):
+                yield {
+                    "student_id": first_student_id + index,
+                    "test_id": test_id,
+                    "score": rng.randint(0, 10),
+                    "completed_at": now - datetime.timedelta(seconds=rng.randint(0, 180 * 24 * 3600))
+                }
+
+    report("результаты", insert_rows(db, models.CompletedTest, result_rows(), batch_size))
+
+    rollups.rebuild_progress(db)
+    db.commit()
+    with engine.begin() as connection:
+        ensure_versions(connection)
+    report("агрегаты прогресса пересчитаны", 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reset", action="store_true", help="удалить и заново создать все таблицы")
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--teachers", type=int, default=100)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--tests-per-course", type=int, default=10)
+    parser.add_argument("--results", type=int, default=250000)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.reset:
+        models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        generate(
+            db,
+            groups=args.groups,
+            students=args.students,
+            teachers=args.teachers,
+            courses=args.courses,
+            tests_per_course=args.tests_per_course,
+            results=args.results,
+            password=args.password,
+            seed=args.seed,
+            batch_size=args.batch_size
+        )
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+"""Сравнение обычной сериализации списков (ORM + response_model) с быстрым
+путём FAST_JSON_RESPONSES (столбцы + orjson) на больших админских списках.
+
+Запуск из каталога backend (без DATABASE_URL используется временная SQLite):
+
+    python -m benchmarks.serialization --users 20000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/benchmark.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app import main, models
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.pagination import MAX_PAGE_SIZE
+
+ENDPOINTS = ("/api/admin/users", "/api/admin/tests", "/api/admin/courses", "/api/groups")
+
+
+def seed(users: int):
+    db = SessionLocal()
+    try:
+        groups = max(users // 25, 1)
+        teachers = max(users // 50, 1)
+        db.execute(insert(models.Group), [{"name": f"Группа {index}"} for index in range(groups)])
+        db.execute(insert(models.User), [
+            {
+                "login": f"bench_{index}",
+                "email": f"bench_{index}@example.com",
+                "fio": f"Пользователь {index}",
+                "password_hash": "-",
+                "role": "admin" if index == 0 else "teacher" if index <= teachers else "student",
+                "group_id": None if index <= teachers else index % groups + 1
+            }
+            for index in range(users)
+        ])
+        db.execute(insert(models.Course), [
+            {"name": f"Курс {index}", "teacher_id": index % teachers + 2, "group_id": index % groups + 1}
+            for index in range(groups * 2)
+        ])
+        db.execute(insert(models.Test), [
+            {"name": f"Тест {index}", "course_id": index % (groups * 2) + 1}
+            for index in range(groups * 20)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def measure(client: TestClient, headers, path: str, fast: bool, repeat: int):
+    main.FAST_JSON_RESPONSES = fast
+    timings = []
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, params={"limit": MAX_PAGE_SIZE}, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        body = response.content
+    return timings, body
+
+def run(users: int, repeat: int):
+    seed(users)
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'login': 'bench_0'})}"}
+
+    print(f"{'endpoint':<22} {'обычный, мс':>12} {'orjson, мс':>12} {'ускорение':>10} {'байт':>9}")
+    for path in ENDPOINTS:
+        # Прогрев: кеш пользователя, подготовленные запросы, адаптеры схем
+        measure(client, headers, path, False, 1)
+        measure(client, headers, path, True, 1)
+
+        regular, regular_body = measure(client, headers, path, False, repeat)
+        fast, fast_body = measure(client, headers, path, True, repeat)
+
+        if json.loads(regular_body) != json.loads(fast_body):
+            print(f"{path}: ответы двух путей различаются")
+
+        regular_median = statistics.median(regular)
+        fast_median = statistics.median(fast)
+        print(
+            f"{path:<22} {regular_median:>12.1f} {fast_median:>12.1f} "
+            f"{regular_median / fast_median:>9.1f}x {len(fast_body):>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.users, args.repeat)
@@ -0,0 +1,56 @@
+"""Общие фикстуры тестов: приложение работает с временной SQLite, если DATABASE_URL не задан.
+
+Запуск из каталога backend:
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+import tempfile
+import uuid
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/tests.db")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, models
+from app.auth import create_access_token
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+@pytest.fixture
+def auth_headers():
+    def headers(login: str):
+        return {"Authorization": f"Bearer {create_access_token(data={'login': login})}"}
+    return headers
+
+@pytest.fixture
+def make_user(db):
+    """Создать пользователя с уникальным логином; база общая для всех тестов"""
+    def make(role: str, group_id=None):
+        login = f"{role}_{uuid.uuid4().hex[:12]}"
+        user = models.User(
+            login=login,
+            email=f"{login}@example.com",
+            fio=login,
+            password_hash="-",
+            role=role,
+            group_id=group_id
+        )
+        db.add(user)
+        db.flush()
+        return user
+    return make
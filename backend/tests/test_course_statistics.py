@@ -0,0 +1,124 @@
+import datetime
+
+from sqlalchemy import insert
+
+from app import main, models, rollups
+from app.schemas import CourseStatistics, StudentProgress
+
+
+def load_course_statistics_per_student(db, course_id: int, current_user):
+    """Прежняя реализация: результаты каждого студента читаются отдельным запросом"""
+    course = db.query(models.Course)\
+        .filter(
+            models.Course.id == course_id,
+            models.Course.teacher_id == current_user.id
+        )\
+        .first()
+
+    students = db.query(models.User)\
+        .filter(
+            models.User.group_id == course.group_id,
+            models.User.role == "student"
+        )\
+        .all()
+
+    tests = db.query(models.Test)\
+        .filter(models.Test.course_id == course_id)\
+        .all()
+
+    total_tests = len(tests)
+    student_progress_list = []
+    total_completion_rate = 0
+    total_score = 0
+    active_students = 0
+
+    for student in students:
+        completed_tests = db.query(models.CompletedTest)\
+            .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
+            .filter(
+                models.CompletedTest.student_id == student.id,
+                models.Test.course_id == course_id
+            )\
+            .all()
+
+        completed_count = len(completed_tests)
+        completion_rate = round((completed_count / total_tests * 100), 1) if total_tests > 0 else 0.0
+
+        if completed_count > 0:
+            student_avg_score = sum(test.score for test in completed_tests) / completed_count
+            total_score += student_avg_score
+            active_students += 1
+        else:
+            student_avg_score = 0
+
+        last_activity = None
+        if completed_tests:
+            last_activity = max(test.completed_at for test in completed_tests)
+
+        student_progress_list.append(StudentProgress(
+            student_id=student.id,
+            student_name=student.fio,
+            student_login=student.login,
+            completed_tests=completed_count,
+            total_tests=total_tests,
+            completion_rate=completion_rate,
+            average_score=round(student_avg_score, 1),
+            last_activity=last_activity
+        ))
+        total_completion_rate += completion_rate
+
+    total_students = len(students)
+    avg_completion_rate = round(total_completion_rate / total_students, 1) if total_students > 0 else 0.0
+    avg_score = round(total_score / active_students, 1) if active_students > 0 else 0.0
+
+    return CourseStatistics(
+        course_id=course.id,
+        course_name=course.name,
+        group_name=course.group.name,
+        total_students=total_students,
+        total_tests=total_tests,
+        average_completion_rate=avg_completion_rate,
+        average_score=avg_score,
+        student_progress=student_progress_list
+    )
+
+def test_course_statistics_match_per_student_implementation(db, make_user):
+    group = models.Group(name="Группа статистики")
+    db.add(group)
+    db.flush()
+    teacher = make_user("teacher")
+    students = [make_user("student", group.id) for _ in range(6)]
+    # Студент другой группы с результатами по курсу в статистику не попадает
+    outsider = make_user("student")
+    courses = [
+        models.Course(name=f"Курс статистики {index}", teacher_id=teacher.id, group_id=group.id)
+        for index in range(3)
+    ]
+    db.add_all(courses)
+    db.flush()
+    tests = [models.Test(name=f"Тест {index}", course_id=courses[index % 2].id) for index in range(7)]
+    db.add_all(tests)
+    db.flush()
+
+    started = datetime.datetime(2026, 1, 1, 9, 0, 0)
+    results = [
+        {
+            "student_id": student.id,
+            "test_id": test.id,
+            "score": (student.id * 3 + test.id) % 11,
+            "completed_at": started + datetime.timedelta(minutes=student.id * 7 + test.id)
+        }
+        for student in students[:-1] + [outsider]
+        for test in tests
+        if (student.id + test.id) % 3
+    ]
+    db.execute(insert(models.CompletedTest), results)
+    rollups.refresh_progress(db, course_ids=[course.id for course in courses])
+    db.flush()
+
+    for course in courses:
+        expected = load_course_statistics_per_student(db, course.id, teacher)
+        actual = CourseStatistics.model_validate(main.load_course_statistics(db, course.id, teacher), from_attributes=True)
+        assert actual.model_dump() == expected.model_dump()
+
+    db.rollback()
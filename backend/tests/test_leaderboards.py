@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from app import models
+
+
+def expected_group_ranking(db, group_id: int, teacher_id: int):
+    """Суммы баллов студентов группы по курсам преподавателя, посчитанные по completed_tests"""
+    totals = defaultdict(int)
+    results = db.query(models.CompletedTest.student_id, models.CompletedTest.score)\
+        .join(models.Test, models.CompletedTest.test_id == models.Test.id)\
+        .join(models.Course, models.Test.course_id == models.Course.id)\
+        .join(models.User, models.User.id == models.CompletedTest.student_id)\
+        .filter(
+            models.Course.group_id == group_id,
+            models.Course.teacher_id == teacher_id,
+            models.User.group_id == group_id
+        )
+    for student_id, score in results:
+        totals[student_id] += score
+
+    ordered = sorted(totals.items(), key=lambda item: (-item[1], -item[0]))
+    return [
+        (sum(1 for other in totals.values() if other > score) + 1, student_id, score)
+        for student_id, score in ordered
+    ]
+
+def test_group_leaderboard_follows_results_and_moved_courses(client, db, make_user, auth_headers):
+    groups = [models.Group(name=f"Группа рейтинга {index}") for index in range(2)]
+    db.add_all(groups)
+    db.flush()
+    teacher, admin = make_user("teacher"), make_user("admin")
+    students = [make_user("student", groups[0].id) for _ in range(5)]
+    courses = [
+        models.Course(name=f"Курс рейтинга {index}", teacher_id=teacher.id, group_id=groups[0].id)
+        for index in range(2)
+    ]
+    db.add_all(courses)
+    db.flush()
+    tests = [models.Test(name=f"Тест рейтинга {index}", course_id=courses[index % 2].id) for index in range(4)]
+    db.add_all(tests)
+    db.commit()
+    group_ids = [group.id for group in groups]
+    teacher_id, teacher_login = teacher.id, teacher.login
+
+    for index, student in enumerate(students[:-1]):
+        for test in tests[index % 2:]:
+            response = client.post(
+                "/api/completed-tests",
+                json={"test_id": test.id, "score": (index * 3 + test.id) % 11},
+                headers=auth_headers(student.login)
+            )
+            assert response.status_code == 200
+
+    def leaderboard(group_id: int, student_id: int):
+        response = client.get(
+            f"/api/teacher/groups/{group_id}/leaderboard",
+            params={"student_id": student_id},
+            headers=auth_headers(teacher_login)
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def assert_matches(group_id: int):
+        expected = expected_group_ranking(db, group_id, teacher_id)
+        board = leaderboard(group_id, students[-1].id)
+        assert [(entry["rank"], entry["student_id"], entry["total_score"]) for entry in board["entries"]] == expected
+        # Студент без результатов - после всех, у кого сумма баллов больше нуля
+        assert board["student"]["rank"] == sum(1 for _, _, score in expected if score > 0) + 1
+
+    assert_matches(group_ids[0])
+
+    # Перенос курса в другую группу убирает его результаты из сумм прежней группы
+    course = courses[1]
+    response = client.put(f"/api/admin/courses/{course.id}", headers=auth_headers(admin.login), json={
+        "name": course.name,
+        "teacher_id": teacher_id,
+        "group_id": group_ids[1]
+    })
+    assert response.status_code == 200
+    db.expire_all()
+    assert_matches(group_ids[0])
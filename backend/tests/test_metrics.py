@@ -0,0 +1,30 @@
+import re
+
+from app import models
+
+
+def metric_value(text: str, name: str, cache: str):
+    match = re.search(rf'^{name}{{cache="{cache}"}} (\S+)$', text, re.MULTILINE)
+    assert match, f"{name} для кеша {cache} нет в /metrics"
+    return float(match.group(1))
+
+def test_result_cache_counters_are_exported(client, db, make_user, auth_headers):
+    group = models.Group(name="Группа метрик")
+    db.add(group)
+    db.flush()
+    teacher = make_user("teacher")
+    course = models.Course(name="Курс метрик", teacher_id=teacher.id, group_id=group.id)
+    db.add(course)
+    db.commit()
+    path = f"/api/teacher/courses/{course.id}/statistics"
+
+    before = client.get("/metrics").text
+    client.get(path, headers=auth_headers(teacher.login))
+    client.get(path, headers=auth_headers(teacher.login))
+    after = client.get("/metrics").text
+
+    assert metric_value(after, "cache_hits_total", "result") > metric_value(before, "cache_hits_total", "result")
+    assert metric_value(after, "cache_misses_total", "result") > metric_value(before, "cache_misses_total", "result")
+    for name in ("cache_evictions_total", "cache_entries", "cache_max_entries"):
+        metric_value(after, name, "result")
+    metric_value(after, "cache_hits_total", "principal")
@@ -0,0 +1,36 @@
+from sqlalchemy import insert
+
+from app import models
+
+
+def test_completed_tests_pages_through_results_stamped_in_the_same_second(client, db, make_user, auth_headers):
+    group = models.Group(name="Группа пагинации")
+    db.add(group)
+    db.flush()
+    teacher = make_user("teacher")
+    student = make_user("student", group.id)
+    course = models.Course(name="Курс пагинации", teacher_id=teacher.id, group_id=group.id)
+    db.add(course)
+    db.flush()
+    tests = [models.Test(name=f"Тест {index}", course_id=course.id) for index in range(5)]
+    db.add_all(tests)
+    db.flush()
+    # Одна вставка: completed_at из server_default одинаковый у всех строк
+    db.execute(insert(models.CompletedTest), [
+        {"student_id": student.id, "test_id": test.id, "score": 5} for test in tests
+    ])
+    db.commit()
+
+    seen, cursor = [], None
+    for _ in range(len(tests) + 1):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/student/completed-tests", params=params, headers=auth_headers(student.login))
+        assert response.status_code == 200
+        page = response.json()
+        seen += [item["test_name"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert cursor is None
+    assert seen == [test.name for test in reversed(tests)]
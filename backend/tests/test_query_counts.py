@@ -0,0 +1,10 @@
+from benchmarks.query_counts import check
+
+
+def test_query_counts_do_not_grow_and_fit_budgets():
+    failed = {
+        f"{role} {template}": (before, after, budget, problems)
+        for role, template, before, after, budget, problems in check()
+        if problems
+    }
+    assert failed == {}
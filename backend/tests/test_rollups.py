@@ -0,0 +1,84 @@
+import threading
+
+from sqlalchemy import and_
+
+from app import main, models, rollups
+from app.database import SessionLocal
+
+
+def progress_snapshot(db, course_id: int):
+    return (
+        sorted(db.query(
+            models.StudentCourseProgress.student_id,
+            models.StudentCourseProgress.course_id,
+            models.StudentCourseProgress.completed_count,
+            models.StudentCourseProgress.score_sum
+        ).filter(models.StudentCourseProgress.course_id == course_id).all()),
+        sorted(db.query(
+            models.StudentGroupProgress.group_id,
+            models.StudentGroupProgress.teacher_id,
+            models.StudentGroupProgress.student_id,
+            models.StudentGroupProgress.completed_count,
+            models.StudentGroupProgress.score_sum
+        )\
+            .join(models.Course, and_(
+                models.StudentGroupProgress.group_id == models.Course.group_id,
+                models.StudentGroupProgress.teacher_id == models.Course.teacher_id
+            ))\
+            .filter(models.Course.id == course_id)\
+            .all()),
+        sorted(db.query(
+            models.TestProgress.test_id,
+            models.TestProgress.completed_count,
+            models.TestProgress.score_sum
+        )\
+            .join(models.Test, models.TestProgress.test_id == models.Test.id)\
+            .filter(models.Test.course_id == course_id)\
+            .all())
+    )
+
+def test_concurrent_submits_keep_progress_consistent(db, make_user):
+    group = models.Group(name="Группа одновременных сдач")
+    db.add(group)
+    db.flush()
+    teacher = make_user("teacher")
+    student_ids = [make_user("student", group.id).id for _ in range(3)]
+    course = models.Course(name="Курс одновременных сдач", teacher_id=teacher.id, group_id=group.id)
+    db.add(course)
+    db.flush()
+    tests = [models.Test(name=f"Тест {index}", course_id=course.id) for index in range(10)]
+    db.add_all(tests)
+    db.flush()
+    course_id, test_ids = course.id, [test.id for test in tests]
+    db.commit()
+
+    errors = []
+
+    def submit(worker: int):
+        for attempt in range(40):
+            session = SessionLocal()
+            try:
+                main.upsert_completed_tests(session, [{
+                    "student_id": student_ids[(worker + attempt) % len(student_ids)],
+                    "test_id": test_ids[(worker * 7 + attempt * 3) % len(test_ids)],
+                    "score": (worker + attempt) % 11
+                }])
+                session.commit()
+            except Exception as error:
+                errors.append(error)
+                session.rollback()
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=submit, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    incremental = progress_snapshot(db, course_id)
+    rollups.rebuild_progress(db)
+    db.flush()
+    assert progress_snapshot(db, course_id) == incremental
+    db.rollback()
@@ -0,0 +1,46 @@
+import uuid
+
+from app import user_import
+
+
+def import_csv(client, auth_headers, admin_login: str, rows):
+    body = "login,email,fio,password,role\n" + "".join(f"{','.join(row)}\n" for row in rows)
+    response = client.post(
+        "/api/admin/users/import",
+        content=body.encode(),
+        headers={**auth_headers(admin_login), "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def test_import_reports_malformed_email_per_row(client, make_user, auth_headers, db):
+    admin = make_user("admin")
+    db.commit()
+    prefix = uuid.uuid4().hex[:8]
+
+    report = import_csv(client, auth_headers, admin.login, [
+        (f"{prefix}_a", f"{prefix}_a@example.com", "А", "secret", "student"),
+        (f"{prefix}_b", "не-почта", "Б", "secret", "student"),
+        (f"{prefix}_c", f"{prefix}_c@example.com", "В", "secret", "teacher"),
+    ])
+
+    assert report["created"] == 2 and report["failed"] == 1
+    assert [row["status"] for row in report["rows"]] == ["created", "error", "created"]
+    assert report["rows"][1]["detail"].startswith("email")
+
+def test_import_rejects_only_rows_taken_after_the_check(client, make_user, auth_headers, db, monkeypatch):
+    admin = make_user("admin")
+    taken = make_user("student")
+    db.commit()
+    prefix = uuid.uuid4().hex[:8]
+
+    # Как будто пользователь появился между проверкой пачки и вставкой
+    monkeypatch.setattr(user_import, "find_conflicts", lambda db, logins, emails, group_ids: (set(), set(), set()))
+    report = import_csv(client, auth_headers, admin.login, [
+        (f"{prefix}_a", f"{prefix}_a@example.com", "А", "secret", "student"),
+        (taken.login, f"{prefix}_taken@example.com", "Б", "secret", "student"),
+        (f"{prefix}_c", f"{prefix}_c@example.com", "В", "secret", "student"),
+    ])
+
+    assert [row["status"] for row in report["rows"]] == ["created", "error", "created"]
+    assert report["rows"][1]["detail"] == "Пользователь с таким логином или email уже существует"
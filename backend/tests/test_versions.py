@@ -0,0 +1,70 @@
+from app import models
+
+
+def test_submit_changes_etags_of_its_course_only(client, db, make_user, auth_headers):
+    group = models.Group(name="Группа версий")
+    db.add(group)
+    db.flush()
+    teacher = make_user("teacher")
+    student = make_user("student", group.id)
+    courses = [
+        models.Course(name=f"Курс версий {index}", teacher_id=teacher.id, group_id=group.id)
+        for index in range(2)
+    ]
+    db.add_all(courses)
+    db.flush()
+    test = models.Test(name="Тест версий", course_id=courses[0].id)
+    db.add(test)
+    db.commit()
+    course_ids, test_id = [course.id for course in courses], test.id
+
+    def etags():
+        return [
+            client.get(path, headers=auth_headers(teacher.login)).headers["etag"]
+            for path in (
+                *(f"/api/teacher/courses/{course_id}/statistics" for course_id in course_ids),
+                "/api/teacher/stats",
+                "/api/teacher/analytics"
+            )
+        ]
+
+    before = etags()
+    response = client.post("/api/completed-tests", json={"test_id": test_id, "score": 7}, headers=auth_headers(student.login))
+    assert response.status_code == 200
+    after = etags()
+
+    submitted_course, other_course, teacher_stats, analytics = [old != new for old, new in zip(before, after)]
+    assert submitted_course and analytics
+    assert not other_course and not teacher_stats
+
+def test_moving_student_to_another_group_changes_student_etags(client, db, make_user, auth_headers):
+    groups = [models.Group(name=f"Группа перевода {index}") for index in range(2)]
+    db.add_all(groups)
+    db.flush()
+    teacher = make_user("teacher")
+    admin = make_user("admin")
+    student = make_user("student", groups[0].id)
+    course = models.Course(name="Курс перевода", teacher_id=teacher.id, group_id=groups[0].id)
+    db.add(course)
+    db.flush()
+    db.add(models.Test(name="Тест перевода", course_id=course.id))
+    db.commit()
+    paths = ("/api/student/stats", f"/api/courses/{course.id}/tests", f"/api/courses/{course.id}/tests-with-completion")
+
+    etags = {path: client.get(path, headers=auth_headers(student.login)).headers["etag"] for path in paths}
+
+    response = client.put(f"/api/admin/users/{student.id}", headers=auth_headers(admin.login), json={
+        "login": student.login,
+        "email": student.email,
+        "fio": student.fio,
+        "role": "student",
+        "group_id": groups[1].id
+    })
+    assert response.status_code == 200
+
+    stats = client.get(paths[0], headers={**auth_headers(student.login), "If-None-Match": etags[paths[0]]})
+    assert stats.status_code == 200
+    assert stats.json()["total_tests_count"] == 0
+    for path in paths[1:]:
+        response = client.get(path, headers={**auth_headers(student.login), "If-None-Match": etags[path]})
+        assert response.status_code == 403
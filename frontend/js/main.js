@@ -1,6 +1,55 @@
 const { createApp } = Vue;
 import { API_BASE_URL } from './config.js';
 
+const PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 500;
+const COURSE_EVENTS_RETRY_MS = 3000;
+
+// ETag и тело последнего ответа на каждый GET-запрос; при 304 ответ берётся отсюда
+const validatorCache = new Map();
+
+function roundToTenth(value) {
+    return Math.round(value * 10) / 10;
+}
+
+// Разбор блока Server-Sent Events на имя события и данные
+function parseServerEvent(block) {
+    let name = 'message';
+    let data = '';
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) {
+            name = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+        }
+    }
+    return { name, data };
+}
+
+async function fetchWithValidators(url, options = {}) {
+    const headers = { ...(options.headers || {}) };
+    const key = `${headers['Authorization'] || ''} ${url}`;
+    const cached = validatorCache.get(key);
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+
+    const response = await fetch(url, { ...options, headers });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json', 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        validatorCache.set(key, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 createApp({
     data() {
         return {
@@ -11,6 +60,8 @@ createApp({
             completedTests: [],
             studentStats: {},
             studentTestDetails: [],
+            studentTestDetailsCursor: null,
+            studentTestDetailsLoading: false,
 
             showTestsModal: false,
             showTestResultModal: false,
@@ -26,6 +77,7 @@ createApp({
             selectedCourseForStats: null,
             courseStatistics: {},
             statsLoading: false,
+            courseEventsController: null,
             showCourseTestsModal: false,
             selectedCourseForTests: null,
             teacherCourseTests: [],
@@ -36,6 +88,8 @@ createApp({
             allUsers: [],
             allGroups: [],
             usersLoading: false,
+            usersCursor: null,
+            usersLoadingMore: false,
             userFormLoading: false,
             editingUser: null,
             userForm: {
@@ -56,6 +110,11 @@ createApp({
             allTests: [],
             allCourses: [],
             allTeachers: [],
+            courseOptions: [],
+            testsCursor: null,
+            coursesCursor: null,
+            testsLoadingMore: false,
+            coursesLoadingMore: false,
             groupsLoading: false,
             coursesLoading: false,
             groupFormLoading: false,
@@ -79,13 +138,10 @@ createApp({
         };
     },
     async mounted() {
-        await this.checkAuthentication();
-        if (this.userProfile) {
-            await this.loadUserData();
-        }
+        await this.loadDashboard();
     },
     methods: {
-        async checkAuthentication() {
+        async loadDashboard() {
             const token = localStorage.getItem('authToken');
             
             if (!token) {
@@ -94,74 +150,44 @@ createApp({
             }
             
             try {
-                const response = await fetch(`${API_BASE_URL}/auth/me`, {
-                    method: 'GET',
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/dashboard`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
                 });
                 
-                if (response.ok) {
-                    this.userProfile = await response.json();
-                    this.isLoading = false;
-                } else {
+                if (!response.ok) {
                     this.clearAuthData();
                     this.redirectToLogin();
+                    return;
                 }
-            } catch (error) {
-                console.error('Auth check error:', error);
-                this.clearAuthData();
-                this.redirectToLogin();
-            }
-        },
 
-        async loadUserData() {
-            try {
-                await this.loadCourses();
-                
-                if (this.userProfile.role === 'student') {
-                    await this.loadStudentData();
-                } else if (this.userProfile.role === 'teacher') {
-                    await this.loadTeacherStats();
-                } else if (this.userProfile.role === 'admin') {
-                    await this.loadAdminStats();
+                const dashboard = await response.json();
+                this.userProfile = dashboard.profile;
+                this.userCourses = dashboard.courses;
+
+                if (dashboard.profile.role === 'student') {
+                    this.studentStats = dashboard.student_stats;
+                    this.studentTestDetails = dashboard.completed_tests.items;
+                    this.studentTestDetailsCursor = dashboard.completed_tests.next_cursor;
+                } else if (dashboard.profile.role === 'teacher') {
+                    this.userStats = dashboard.teacher_stats;
+                } else if (dashboard.profile.role === 'admin') {
+                    this.userStats = dashboard.admin_stats;
                 }
-            } catch (error) {
-                console.error('Error loading user data:', error);
-                alert('Ошибка загрузки данных');
-            }
-        },
 
-        async loadCourses() {
-            try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/courses/my`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-                
-                if (response.ok) {
-                    this.userCourses = await response.json();
-                }
+                this.isLoading = false;
             } catch (error) {
-                console.error('Error loading courses:', error);
-            }
-        },
-
-        async loadStudentData() {
-            try {
-                await this.loadStudentStats();
-                await this.loadCompletedTestsDetails();
-            } catch (error) {
-                console.error('Error loading student data:', error);
+                console.error('Dashboard load error:', error);
+                this.clearAuthData();
+                this.redirectToLogin();
             }
         },
 
         async loadStudentStats() {
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/student/stats`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/student/stats`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -175,55 +201,50 @@ createApp({
             }
         },
 
-        async loadCompletedTestsDetails() {
+        async loadCompletedTestsDetails(loadMore = false) {
+            this.studentTestDetailsLoading = true;
             try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/student/completed-tests`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-                
-                if (response.ok) {
-                    this.studentTestDetails = await response.json();
-                }
+                const page = await this.fetchPage(
+                    '/api/student/completed-tests',
+                    loadMore ? this.studentTestDetailsCursor : null
+                );
+                this.studentTestDetails = loadMore ? [...this.studentTestDetails, ...page.items] : page.items;
+                this.studentTestDetailsCursor = page.next_cursor;
             } catch (error) {
                 console.error('Error loading completed tests details:', error);
+            } finally {
+                this.studentTestDetailsLoading = false;
             }
         },
 
-        async loadTeacherStats() {
-            try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/teacher/stats`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-                
-                if (response.ok) {
-                    this.userStats = await response.json();
-                }
-            } catch (error) {
-                console.error('Error loading teacher stats:', error);
+        async fetchPage(path, cursor = null, params = {}) {
+            const token = localStorage.getItem('authToken');
+            const query = new URLSearchParams({ limit: PAGE_SIZE, ...params });
+            if (cursor) {
+                query.set('cursor', cursor);
             }
-        },
 
-        async loadAdminStats() {
-            try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/stats`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-                
-                if (response.ok) {
-                    this.userStats = await response.json();
+            const response = await fetchWithValidators(`${API_BASE_URL}${path}?${query}`, {
+                headers: {
+                    'Authorization': `Bearer ${token}`
                 }
-            } catch (error) {
-                console.error('Error loading admin stats:', error);
+            });
+
+            if (!response.ok) {
+                throw new Error(`Failed to load ${path}`);
             }
+            return await response.json();
+        },
+
+        async fetchAllPages(path, params = {}) {
+            const items = [];
+            let cursor = null;
+            do {
+                const page = await this.fetchPage(path, cursor, { ...params, limit: MAX_PAGE_SIZE });
+                items.push(...page.items);
+                cursor = page.next_cursor;
+            } while (cursor);
+            return items;
         },
 
         getRoleName(role) {
@@ -240,7 +261,9 @@ createApp({
         },
         
         clearAuthData() {
+            this.unsubscribeCourseEvents();
             localStorage.removeItem('authToken');
+            validatorCache.clear();
         },
         
         redirectToLogin() {
@@ -269,7 +292,7 @@ createApp({
             this.testsLoading = true;
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/courses/${courseId}/tests-with-completion`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/courses/${courseId}/tests-with-completion`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -371,10 +394,13 @@ createApp({
         async openCourseStatistics(course) {
             this.selectedCourseForStats = course;
             this.showCourseStatistics = true;
+            // Подписка раньше загрузки: результаты, сохранённые во время загрузки, придут событиями
+            this.subscribeCourseEvents(course.id);
             await this.loadCourseStatistics(course.id);
         },
 
         closeCourseStatistics() {
+            this.unsubscribeCourseEvents();
             this.showCourseStatistics = false;
             this.selectedCourseForStats = null;
             this.courseStatistics = {};
@@ -384,7 +410,7 @@ createApp({
             this.statsLoading = true;
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/teacher/courses/${courseId}/statistics`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/teacher/courses/${courseId}/statistics`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -404,6 +430,96 @@ createApp({
             }
         },
 
+        subscribeCourseEvents(courseId) {
+            this.unsubscribeCourseEvents();
+            const controller = new AbortController();
+            this.courseEventsController = controller;
+
+            const connect = async () => {
+                try {
+                    const token = localStorage.getItem('authToken');
+                    const response = await fetch(`${API_BASE_URL}/api/teacher/courses/${courseId}/events`, {
+                        headers: {
+                            'Authorization': `Bearer ${token}`
+                        },
+                        signal: controller.signal
+                    });
+
+                    if (!response.ok) {
+                        console.error('Failed to subscribe to course events');
+                        return;
+                    }
+
+                    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                    let buffer = '';
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) break;
+
+                        buffer += value;
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                            this.handleCourseEvent(courseId, parseServerEvent(buffer.slice(0, boundary)));
+                            buffer = buffer.slice(boundary + 2);
+                        }
+                    }
+                } catch (error) {
+                    if (controller.signal.aborted) return;
+                    console.error('Course events stream error:', error);
+                }
+
+                // Соединение оборвалось: переподключиться и догрузить пропущенное
+                setTimeout(() => {
+                    if (controller.signal.aborted) return;
+                    connect();
+                    this.loadCourseStatistics(courseId);
+                }, COURSE_EVENTS_RETRY_MS);
+            };
+
+            connect();
+        },
+
+        unsubscribeCourseEvents() {
+            if (this.courseEventsController) {
+                this.courseEventsController.abort();
+                this.courseEventsController = null;
+            }
+        },
+
+        handleCourseEvent(courseId, event) {
+            if (event.name === 'resync') {
+                // Сервер отбросил события, которые не успели дойти, - загрузить статистику заново
+                this.loadCourseStatistics(courseId);
+            } else if (event.name === 'result') {
+                this.applyCourseResult(JSON.parse(event.data));
+            }
+        },
+
+        applyCourseResult(result) {
+            const stats = this.courseStatistics;
+            const students = stats.student_progress || [];
+            const student = students.find(progress => progress.student_id === result.student_id);
+            if (!student) return;
+
+            // В событии итоги студента по курсу целиком, поэтому повтор события ничего не портит
+            student.completed_tests = result.completed_tests;
+            student.completion_rate = stats.total_tests > 0
+                ? roundToTenth(result.completed_tests / stats.total_tests * 100)
+                : 0;
+            student.average_score = result.completed_tests > 0
+                ? roundToTenth(result.score_sum / result.completed_tests)
+                : 0;
+            student.last_activity = result.last_activity;
+
+            const active = students.filter(progress => progress.completed_tests > 0);
+            stats.average_completion_rate = roundToTenth(
+                students.reduce((sum, progress) => sum + progress.completion_rate, 0) / students.length
+            );
+            stats.average_score = active.length > 0
+                ? roundToTenth(active.reduce((sum, progress) => sum + progress.average_score, 0) / active.length)
+                : 0;
+        },
+
         formatLastActivity(dateString) {
             if (!dateString) return 'Нет активности';
             return new Date(dateString).toLocaleDateString('ru-RU');
@@ -425,7 +541,7 @@ createApp({
             this.teacherTestsLoading = true;
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/teacher/courses/${courseId}/tests`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/teacher/courses/${courseId}/tests`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -488,6 +604,7 @@ createApp({
             this.showUsersManagementModal = false;
             this.allUsers = [];
             this.allGroups = [];
+            this.usersCursor = null;
         },
 
         openAddUserModal() {
@@ -529,7 +646,7 @@ createApp({
         async loadAllGroups() {
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/groups`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/groups`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -545,44 +662,22 @@ createApp({
             }
         },
 
-        async loadAllUsers() {
-            this.usersLoading = true;
+        async loadAllUsers(loadMore = false) {
+            if (loadMore) {
+                this.usersLoadingMore = true;
+            } else {
+                this.usersLoading = true;
+            }
             try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/users`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-
-                if (response.ok) {
-                    const users = await response.json();
-
-                    const groupsResponse = await fetch(`${API_BASE_URL}/api/groups`, {
-                        headers: {
-                            'Authorization': `Bearer ${token}`
-                        }
-                    });
-
-                    if (groupsResponse.ok) {
-                        const groups = await groupsResponse.json();
-
-                        this.allUsers = users.map(user => ({
-                            ...user,
-                            group: groups.find(g => g.id === user.group_id) || null
-                        }));
-                    } else {
-                        this.allUsers = users;
-                    }
-                } else {
-                    console.error('Failed to load users');
-                    alert('Ошибка загрузки пользователей');
-                }
+                const page = await this.fetchPage('/api/admin/users', loadMore ? this.usersCursor : null);
+                this.allUsers = loadMore ? [...this.allUsers, ...page.items] : page.items;
+                this.usersCursor = page.next_cursor;
             } catch (error) {
                 console.error('Error loading users:', error);
                 alert('Ошибка загрузки пользователей');
             } finally {
                 this.usersLoading = false;
+                this.usersLoadingMore = false;
             }
         },
 
@@ -707,7 +802,7 @@ createApp({
             this.groupsLoading = true;
             try {
                 const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/groups`, {
+                const response = await fetchWithValidators(`${API_BASE_URL}/api/admin/groups`, {
                     headers: {
                         'Authorization': `Bearer ${token}`
                     }
@@ -792,12 +887,13 @@ createApp({
         async openTestsManagementModal() {
             this.showTestsManagementModal = true;
             await this.loadAllTests();
-            await this.loadAllCourses();
+            await this.loadCourseOptions();
         },
 
         closeTestsManagementModal() {
             this.showTestsManagementModal = false;
             this.allTests = [];
+            this.testsCursor = null;
         },
 
         openAddTestModal() {
@@ -828,27 +924,30 @@ createApp({
             };
         },
 
-        async loadAllTests() {
-            this.testsLoading = true;
+        async loadAllTests(loadMore = false) {
+            if (loadMore) {
+                this.testsLoadingMore = true;
+            } else {
+                this.testsLoading = true;
+            }
             try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/tests`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-
-                if (response.ok) {
-                    this.allTests = await response.json();
-                } else {
-                    console.error('Failed to load tests');
-                    alert('Ошибка загрузки тестов');
-                }
+                const page = await this.fetchPage('/api/admin/tests', loadMore ? this.testsCursor : null);
+                this.allTests = loadMore ? [...this.allTests, ...page.items] : page.items;
+                this.testsCursor = page.next_cursor;
             } catch (error) {
                 console.error('Error loading tests:', error);
                 alert('Ошибка загрузки тестов');
             } finally {
                 this.testsLoading = false;
+                this.testsLoadingMore = false;
+            }
+        },
+
+        async loadCourseOptions() {
+            try {
+                this.courseOptions = await this.fetchAllPages('/api/admin/courses');
+            } catch (error) {
+                console.error('Error loading course options:', error);
             }
         },
 
@@ -924,6 +1023,7 @@ createApp({
         closeCoursesManagementModal() {
             this.showCoursesManagementModal = false;
             this.allCourses = [];
+            this.coursesCursor = null;
         },
 
         openAddCourseModal() {
@@ -956,45 +1056,28 @@ createApp({
             };
         },
 
-        async loadAllCourses() {
-            this.coursesLoading = true;
+        async loadAllCourses(loadMore = false) {
+            if (loadMore) {
+                this.coursesLoadingMore = true;
+            } else {
+                this.coursesLoading = true;
+            }
             try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/courses`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-
-                if (response.ok) {
-                    this.allCourses = await response.json();
-                } else {
-                    console.error('Failed to load courses');
-                    alert('Ошибка загрузки курсов');
-                }
+                const page = await this.fetchPage('/api/admin/courses', loadMore ? this.coursesCursor : null);
+                this.allCourses = loadMore ? [...this.allCourses, ...page.items] : page.items;
+                this.coursesCursor = page.next_cursor;
             } catch (error) {
                 console.error('Error loading courses:', error);
                 alert('Ошибка загрузки курсов');
             } finally {
                 this.coursesLoading = false;
+                this.coursesLoadingMore = false;
             }
         },
 
         async loadAllTeachers() {
             try {
-                const token = localStorage.getItem('authToken');
-                const response = await fetch(`${API_BASE_URL}/api/admin/users`, {
-                    headers: {
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-
-                if (response.ok) {
-                    const users = await response.json();
-                    this.allTeachers = users.filter(user => user.role === 'teacher');
-                } else {
-                    console.error('Failed to load teachers');
-                }
+                this.allTeachers = await this.fetchAllPages('/api/admin/users', { role: 'teacher' });
             } catch (error) {
                 console.error('Error loading teachers:', error);
             }